@@ -113,6 +113,75 @@ def get_general_constructive_search_for_jobshop(jobshop):
     return encode_problem(domains, lambda n: True, better, "dfs"), decoder
 
 
+def get_symmetry_breaking_search_for_jobshop(jobshop):
+    """
+    Branch and bound over machine loads with jobs assigned in LPT order.
+
+    Nodes are (loads, assignment) tuples, where assignment[k] is the machine of
+    the k-th longest job. Machines with equal load are interchangeable, so a job
+    is only ever placed on the first of them (in particular on at most one empty
+    machine). Children are pruned if max(partial makespan, lower bound) cannot
+    beat the incumbent, with lower bound max(max job, ceil(total / m)), and
+    load profiles that were already expanded (up to machine order) are skipped.
+    """
+    m, d = jobshop
+    n_jobs = len(d)
+    order = sorted(range(n_jobs), key=lambda j: -d[j])
+    durations = [d[j] for j in order]
+    total = sum(durations)
+    lower_bound = max(max(durations, default=0), -(-total // m))
+    expanded = set()
+
+    def incumbent():
+        best = search.best
+        return max(best[0]) if best is not None else float("inf")
+
+    def expand(node):
+        loads, assignment = node
+        k = len(assignment)
+        if k >= n_jobs:
+            return []
+        bound = incumbent()
+        if bound <= lower_bound:
+            return []
+        profile = (k,) + tuple(sorted(loads))
+        if profile in expanded:
+            return []
+        expanded.add(profile)
+        dur = durations[k]
+        children = []
+        seen_loads = set()
+        for machine, load in enumerate(loads):
+            if load in seen_loads:
+                continue
+            seen_loads.add(load)
+            new_load = load + dur
+            if max(new_load, lower_bound) >= bound:
+                continue
+            new_loads = loads[:machine] + (new_load,) + loads[machine + 1:]
+            children.append((new_loads, assignment + (machine,)))
+        # DFS pops from the end: explore the least loaded machine first
+        children.sort(key=lambda child: -child[0][child[1][-1]])
+        return children
+
+    def goal(node):
+        return len(node[1]) == n_jobs
+
+    def better(n1, n2):
+        return max(n1[0]) < max(n2[0])
+
+    search = GeneralConstructiveSearch(expand, goal, better, "dfs")
+    search.initial = ((0,) * m, ())
+    search.reset()
+
+    def decoder(node):
+        if node is None:
+            return None
+        return {order[k]: machine for k, machine in enumerate(node[1])}
+
+    return search, decoder
+
+
 # ========== CONNECT 4 ==========
 
 def get_general_constructive_search_for_connect_4(opponent):
@@ -164,38 +233,140 @@ def get_general_constructive_search_for_connect_4(opponent):
 
 def get_general_constructive_search_for_tour_planning(distances, from_index, to_index):
     """
-    Tuple nodes for speed. Bypass encode_problem.
+    Nodes are (city, visited bitmask, cost, parent) records. Neighbour lists
+    are precomputed without missing (0 or inf) edges, so expansion is O(degree)
+    and the route is only rebuilt from the parent links when decoding.
     """
     n = distances.shape[0]
+    neighbours = []
+    for i in range(n):
+        row = []
+        for city in range(n):
+            d = float(distances[i, city])
+            if city != i and d != 0 and not np.isinf(d):
+                row.append((city, 1 << city, d))
+        neighbours.append(row)
 
     def expand(node):
-        current = node[-1] if len(node) > 0 else from_index
-        visited = set(node)
-        visited.add(from_index)
-        children = []
-        for city in range(n):
-            if city in visited:
-                continue
-            d = distances[current, city]
-            if d == 0 or np.isinf(d):
-                continue
-            children.append(node + (city,))
-        return children
+        current, visited, cost, _ = node
+        return [
+            (city, visited | bit, cost + d, node)
+            for city, bit, d in neighbours[current]
+            if not visited & bit
+        ]
 
     def goal(node):
-        return len(node) > 0 and node[-1] == to_index
-
-    def calc_dist(node):
-        total, curr = 0, from_index
-        for city in node:
-            total += distances[curr, city]
-            curr = city
-        return total
+        return node[3] is not None and node[0] == to_index
 
     def better(n1, n2):
-        return calc_dist(n1) < calc_dist(n2)
+        return n1[2] < n2[2]
 
     search = GeneralConstructiveSearch(expand, goal, better, "dfs")
+    search.initial = (from_index, 1 << from_index, 0.0, None)
+    search.reset()
+
+    def decoder(node):
+        if node is None:
+            return None
+        route = []
+        while node is not None:
+            route.append(node[0])
+            node = node[3]
+        return route[::-1]
+
+    return search, decoder
+
+
+def _held_karp_chunk_size(m, max_bytes):
+    """
+    Number of masks per chunk such that the DP table over `m` cities and the
+    temporaries of one chunk fit into `max_bytes` together (0 if they cannot).
+    """
+    # dp, popcount, by_layer, the workspace of its stable sort and the sorted popcounts
+    table = (1 << m) * (8 * m + 20)
+    # dp[sub ^ bit] and its sum with w[:, j], the sub-masks, their selector and the row minima
+    per_mask = 16 * m + 40
+    return max(0, (max_bytes - table) // per_mask)
+
+
+def _held_karp_tour_planning(distances, from_index, to_index, max_bytes):
+    """
+    Held-Karp DP over visited-set bitmasks of the cities other than `from_index`.
+
+    dp[S, j] is the cost of the cheapest simple path from `from_index` that
+    visits exactly the cities in S and ends in j. Layers of equal |S| are
+    computed together with numpy, in chunks of masks so that the table and the
+    temporaries stay within `max_bytes`. Returns the path as a node tuple, or None.
+    """
+    n = distances.shape[0]
+    others = [c for c in range(n) if c != from_index]
+    m = len(others)
+    if m == 0 or from_index == to_index:
+        return None
+
+    # zero entries mean "no route"; paths end as soon as they reach to_index
+    w = np.array(distances, dtype=float)[np.ix_(others, others)]
+    w[w == 0] = np.inf
+    t = others.index(to_index)
+    w[t, :] = np.inf
+    start = np.array(distances[from_index, others], dtype=float)
+    start[start == 0] = np.inf
+
+    size = 1 << m
+    dp = np.full((size, m), np.inf)
+    dp[1 << np.arange(m), np.arange(m)] = start
+    popcount = np.zeros(size, dtype=np.int8)
+    for k in range(m):
+        popcount[1 << k: 2 << k] = popcount[: 1 << k] + 1
+    by_layer = np.argsort(popcount, kind="stable")
+    layer_bounds = np.searchsorted(popcount[by_layer], np.arange(m + 2))
+
+    chunk_size = max(1, _held_karp_chunk_size(m, max_bytes))
+    for k in range(2, m + 1):
+        layer = by_layer[layer_bounds[k]: layer_bounds[k + 1]]
+        for lo in range(0, len(layer), chunk_size):
+            masks = layer[lo: lo + chunk_size]
+            for j in range(m):
+                bit = 1 << j
+                sub = masks[(masks & bit) != 0]
+                if len(sub) > 0:
+                    dp[sub, j] = (dp[sub ^ bit] + w[:, j]).min(axis=1)
+
+    mask = int(np.argmin(dp[:, t]))
+    if np.isinf(dp[mask, t]):
+        return None
+    path = [t]
+    while mask & (mask - 1):
+        j = path[-1]
+        mask ^= 1 << j
+        path.append(int(np.argmin(dp[mask] + w[:, j])))
+    return tuple(others[j] for j in reversed(path))
+
+
+def get_held_karp_search_for_tour_planning(distances, from_index, to_index, max_bytes=2 ** 28):
+    """
+    Exact tour planning via Held-Karp. The optimal path is computed upfront and
+    handed out by a single expansion, so the (search, decoder) pair behaves like
+    the one of `get_general_constructive_search_for_tour_planning`. If the DP
+    table and the temporaries of at least one chunk of masks would not fit into
+    `max_bytes`, that search is returned instead.
+    """
+    n = distances.shape[0]
+    m = max(n - 1, 1)
+    if _held_karp_chunk_size(m, max_bytes) == 0:
+        return get_general_constructive_search_for_tour_planning(distances, from_index, to_index)
+
+    path = _held_karp_tour_planning(distances, from_index, to_index, max_bytes)
+
+    def expand(node):
+        if node == () and path is not None:
+            return [path]
+        return []
+
+    def goal(node):
+        return len(node) > 0 and node[-1] == to_index
+
+    search = GeneralConstructiveSearch(expand, goal, None, "dfs")
     search.initial = ()
     search.reset()
 
@@ -204,4 +375,4 @@ def get_general_constructive_search_for_tour_planning(distances, from_index, to_
             return None
         return [from_index] + list(node)
 
-    return search, decoder
\ No newline at end of file
+    return search, decoder
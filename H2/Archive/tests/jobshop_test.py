@@ -4,7 +4,7 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from task_encodings import get_general_constructive_search_for_jobshop
+from task_encodings import get_general_constructive_search_for_jobshop, get_symmetry_breaking_search_for_jobshop
 
 class TestJobShop(unittest.TestCase):
     def setUp(self):
@@ -42,5 +42,33 @@ class TestJobShop(unittest.TestCase):
         self.assertIsInstance(result, dict)
         self.assertTrue(all(isinstance(v, list) for v in result.values()))
 
+class TestSymmetryBreakingJobShop(unittest.TestCase):
+    def solve(self, data):
+        search, decoder = get_symmetry_breaking_search_for_jobshop(data)
+        while search.active:
+            search.step()
+        result = decoder(search.best)
+        clocks = [0] * data[0]
+        for job_idx, machine_id in result.items():
+            clocks[machine_id] += data[1][job_idx]
+        return result, max(clocks)
+
+    def test_optimization(self):
+        """Check that the optimal makespan of 30 is found for [10, 20, 30] on 2 machines."""
+        result, makespan = self.solve((2, [10, 20, 30]))
+        self.assertEqual(sorted(result.keys()), [0, 1, 2])
+        self.assertEqual(makespan, 30)
+
+    def test_lower_bound_not_reachable(self):
+        """Eleven jobs of duration 7 on 5 machines need three rounds on some machine."""
+        _, makespan = self.solve((5, [7] * 11))
+        self.assertEqual(makespan, 21)
+
+    def test_large_instance(self):
+        """30 jobs on 5 machines are solved to the ceil(total / m) bound."""
+        durations = [(17 * i) % 97 + 1 for i in range(30)]
+        _, makespan = self.solve((5, durations))
+        self.assertEqual(makespan, -(-sum(durations) // 5))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
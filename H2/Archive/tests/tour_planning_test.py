@@ -0,0 +1,79 @@
+import unittest
+import numpy as np
+import sys
+import os
+import tracemalloc
+from unittest import mock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import task_encodings
+from task_encodings import get_general_constructive_search_for_tour_planning, get_held_karp_search_for_tour_planning
+
+def solve(search, decoder):
+    while search.active:
+        search.step()
+    return decoder(search.best)
+
+def route_cost(distances, route):
+    return sum(distances[a, b] for a, b in zip(route, route[1:]))
+
+class TestTourPlanning(unittest.TestCase):
+    def setUp(self):
+        # Random sparse graphs (0 = no route) small enough for the plain search
+        self.instances = []
+        for seed in range(10):
+            rs = np.random.RandomState(seed)
+            n = rs.randint(3, 8)
+            distances = rs.rand(n, n) * 10
+            distances[rs.rand(n, n) < 0.3] = 0
+            np.fill_diagonal(distances, 0)
+            self.instances.append((distances, 0, n - 1))
+
+    def test_held_karp_matches_search(self):
+        """Held-Karp finds routes exactly as short as the exhaustive search."""
+        for distances, from_index, to_index in self.instances:
+            expected = solve(*get_general_constructive_search_for_tour_planning(distances, from_index, to_index))
+            route = solve(*get_held_karp_search_for_tour_planning(distances, from_index, to_index))
+            if expected is None:
+                self.assertIsNone(route)
+                continue
+            self.assertEqual(route[0], from_index)
+            self.assertEqual(route[-1], to_index)
+            self.assertEqual(len(set(route)), len(route), "Route visits a place twice.")
+            self.assertAlmostEqual(route_cost(distances, route), route_cost(distances, expected))
+
+    def test_held_karp_falls_back(self):
+        """A memory budget too small for the DP table falls back to the search."""
+        distances, from_index, to_index = self.instances[0]
+        route = solve(*get_held_karp_search_for_tour_planning(distances, from_index, to_index, max_bytes=1))
+        expected = solve(*get_general_constructive_search_for_tour_planning(distances, from_index, to_index))
+        self.assertEqual(route, expected)
+
+    def test_held_karp_stays_within_max_bytes(self):
+        """The DP table and the chunk temporaries together stay within the memory budget."""
+        rs = np.random.RandomState(0)
+        n = 12
+        distances = rs.rand(n, n) * 10
+        np.fill_diagonal(distances, 0)
+        m = n - 1
+        expected = solve(*get_held_karp_search_for_tour_planning(distances, 0, n - 1))
+        for max_bytes in ((1 << m) * (8 * m + 20) + 16 * m + 40, (1 << m) * (8 * m + 20) + 2 ** 16):
+            tracemalloc.start()
+            route = solve(*get_held_karp_search_for_tour_planning(distances, 0, n - 1, max_bytes=max_bytes))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.assertLessEqual(peak, max_bytes)
+            self.assertAlmostEqual(route_cost(distances, route), route_cost(distances, expected))
+
+    def test_held_karp_needs_room_for_chunks(self):
+        """A budget that fits the DP table but no chunk of temporaries falls back to the search."""
+        distances, from_index, to_index = self.instances[0]
+        m = distances.shape[0] - 1
+        with mock.patch.object(task_encodings, "_held_karp_tour_planning", side_effect=AssertionError):
+            route = solve(*get_held_karp_search_for_tour_planning(distances, from_index, to_index, max_bytes=(1 << m) * (8 * m + 9)))
+        expected = solve(*get_general_constructive_search_for_tour_planning(distances, from_index, to_index))
+        self.assertEqual(route, expected)
+
+if __name__ == "__main__":
+    unittest.main()
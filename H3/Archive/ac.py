@@ -1,5 +1,39 @@
 from general_constructive_search import GeneralConstructiveSearch
 from collections import deque
+import numpy as np
+
+
+# --- Table-driven bit helpers (domains of any size are split into 16-bit chunks) ---
+_POPCOUNT_16 = [0] * (1 << 16)
+for _i in range(1, 1 << 16):
+    _POPCOUNT_16[_i] = _POPCOUNT_16[_i >> 1] + (_i & 1)
+
+
+def popcount(x):
+    """Number of set bits of a non-negative int."""
+    c = 0
+    while x:
+        c += _POPCOUNT_16[x & 0xFFFF]
+        x >>= 16
+    return c
+
+
+def lowbit_index(x):
+    """Index of the lowest set bit of a positive int."""
+    return (x & -x).bit_length() - 1
+
+
+def luby(i):
+    """i-th element (1-based) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
 
 
 def revise(bcn, X_i, X_j):
@@ -37,6 +71,9 @@ def ac3(bcn):
     """
     Reduces the domains in a BCN to make it arc consistent, if possible.
 
+    Global constraints (keys with more than two variables, e.g. `AllDifferent`)
+    are filtered with their own propagator whenever one of their variables changes.
+
     Args:
         bcn ((domains, constraints)): The BCN to make arc consistent (if possible)
 
@@ -49,19 +86,54 @@ def ac3(bcn):
     domains = {k: set(v) for k, v in domains.items()}
 
     neighbors = {var: set() for var in domains}
-    for (A, B) in constraints:
-        neighbors[A].add(B)
-        neighbors[B].add(A)
+    var_globals = {var: [] for var in domains}
+    global_keys = []
+    for key in constraints:
+        if len(key) == 2:
+            A, B = key
+            neighbors[A].add(B)
+            neighbors[B].add(A)
+        else:
+            global_keys.append(key)
+            for var in key:
+                var_globals[var].append(key)
 
     queue = deque()
     in_queue = set()
-    for (A, B) in constraints:
-        queue.append((A, B))
-        queue.append((B, A))
-        in_queue.add((A, B))
-        in_queue.add((B, A))
+    for key in constraints:
+        if len(key) == 2:
+            A, B = key
+            queue.append((A, B))
+            queue.append((B, A))
+            in_queue.add((A, B))
+            in_queue.add((B, A))
+    global_queue = deque(global_keys)
+    in_global_queue = set(global_keys)
+
+    def _schedule(X_i, source):
+        for X_k in neighbors[X_i]:
+            if X_k != source:
+                arc = (X_k, X_i)
+                if arc not in in_queue:
+                    queue.append(arc)
+                    in_queue.add(arc)
+        for key in var_globals[X_i]:
+            if key != source and key not in in_global_queue:
+                global_queue.append(key)
+                in_global_queue.add(key)
+
+    while queue or global_queue:
+        if not queue:
+            key = global_queue.popleft()
+            in_global_queue.discard(key)
+            reduced = constraints[key].filter(domains)
+            if reduced is None:
+                return (domains, constraints), False
+            for var, D in reduced.items():
+                domains[var] = D
+                _schedule(var, key)
+            continue
 
-    while queue:
         X_i, X_j = queue.popleft()
         in_queue.discard((X_i, X_j))
 
@@ -70,16 +142,700 @@ def ac3(bcn):
             domains[X_i] = D_i
             if not D_i:
                 return (domains, constraints), False
-            for X_k in neighbors[X_i]:
-                if X_k != X_j:
-                    arc = (X_k, X_i)
-                    if arc not in in_queue:
-                        queue.append(arc)
-                        in_queue.add(arc)
+            _schedule(X_i, X_j)
+
+    return (domains, constraints), True
+
+
+def ac2001(bcn):
+    """
+    AC-2001: like `ac3`, but remembers for every arc (X_i, X_j) and value of X_i
+    the position of its last support in the (fixed) value order of X_j. When the
+    arc is revised again, a value whose last support is still in the domain is
+    kept without any check, and otherwise the search resumes after that support,
+    so every value pair is checked at most once over the whole run.
+
+    Args:
+        bcn ((domains, constraints)): The BCN to make arc consistent (if possible)
+
+    Returns:
+        (bcn', feasible) as in `ac3`
+    """
+    domains, constraints = bcn
+    order = {var: list(D) for var, D in domains.items()}
+    domains = {var: set(D) for var, D in domains.items()}
+
+    neighbors = {var: set() for var in domains}
+    var_globals = {var: [] for var in domains}
+    global_keys = []
+    arcs = {}
+    for key, constraint in constraints.items():
+        if len(key) == 2:
+            A, B = key
+            neighbors[A].add(B)
+            neighbors[B].add(A)
+            arcs[(A, B)] = (constraint, False)
+            arcs[(B, A)] = (constraint, True)
+        else:
+            global_keys.append(key)
+            for var in key:
+                var_globals[var].append(key)
+    last = {arc: {} for arc in arcs}
+
+    queue = deque(arcs)
+    in_queue = set(arcs)
+    global_queue = deque(global_keys)
+    in_global_queue = set(global_keys)
+
+    def _schedule(X_i, source):
+        for X_k in neighbors[X_i]:
+            if X_k != source:
+                arc = (X_k, X_i)
+                if arc not in in_queue:
+                    queue.append(arc)
+                    in_queue.add(arc)
+        for key in var_globals[X_i]:
+            if key != source and key not in in_global_queue:
+                global_queue.append(key)
+                in_global_queue.add(key)
+
+    def _revise(X_i, X_j):
+        """Returns the values of X_i that lost their last support in X_j."""
+        constraint, swap = arcs[(X_i, X_j)]
+        D_j = domains[X_j]
+        vals_j = order[X_j]
+        last_ij = last[(X_i, X_j)]
+        removed = []
+        for v_i in domains[X_i]:
+            s = last_ij.get(v_i, -1)
+            if s >= 0 and vals_j[s] in D_j:
+                continue
+            for t in range(s + 1, len(vals_j)):
+                v_j = vals_j[t]
+                if v_j in D_j and (constraint(v_j, v_i) if swap else constraint(v_i, v_j)):
+                    last_ij[v_i] = t
+                    break
+            else:
+                removed.append(v_i)
+        return removed
+
+    while queue or global_queue:
+        if not queue:
+            key = global_queue.popleft()
+            in_global_queue.discard(key)
+            reduced = constraints[key].filter(domains)
+            if reduced is None:
+                return (domains, constraints), False
+            for var, D in reduced.items():
+                domains[var] = D
+                _schedule(var, key)
+            continue
+
+        X_i, X_j = queue.popleft()
+        in_queue.discard((X_i, X_j))
+
+        removed = _revise(X_i, X_j)
+        if removed:
+            domains[X_i].difference_update(removed)
+            if not domains[X_i]:
+                return (domains, constraints), False
+            _schedule(X_i, X_j)
 
     return (domains, constraints), True
 
 
+class AllDifferent:
+    """
+    Global all-different constraint over the variables of its key.
+
+    It is stored in a BCN under the sorted tuple of its variables in place of
+    the n(n-1)/2 binarized constraints, and filtered with Regin's matching
+    based propagator, which removes every value that cannot be part of any
+    all-different assignment (generalized arc consistency).
+    """
+
+    def __init__(self, variables):
+        self.variables = tuple(variables)
+
+    def __call__(self, *values):
+        return len(set(values)) == len(values)
+
+    def filter(self, domains):
+        """
+        Args:
+            domains (dict): current domains (sets) of at least the variables of this constraint
+
+        Returns:
+            dict: the reduced domains of the variables that changed, or None if the constraint cannot be satisfied
+        """
+        variables = self.variables
+        doms = [domains[var] for var in variables]
+        values = list({v for D in doms for v in D})
+        value_ids = {v: k for k, v in enumerate(values)}
+        supported = _regin_supports([[value_ids[v] for v in D] for D in doms], len(values))
+        if supported is None:
+            return None
+        reduced = {}
+        for var, D, kept in zip(variables, doms, supported):
+            if len(kept) < len(D):
+                reduced[var] = {values[k] for k in kept}
+        return reduced
+
+    def filter_bits(self, masks):
+        """
+        Same filtering as `filter`, for variables that share one value indexing.
+
+        Args:
+            masks (list): bitset domain of every variable of this constraint, in order
+
+        Returns:
+            list: the reduced bitsets (same order), or None if the constraint cannot be satisfied
+        """
+        union = 0
+        adjacency = []
+        for m in masks:
+            union |= m
+            positions = []
+            while m:
+                low = m & -m
+                m ^= low
+                positions.append(low.bit_length() - 1)
+            adjacency.append(positions)
+        supported = _regin_supports(adjacency, union.bit_length())
+        if supported is None:
+            return None
+        result = []
+        for kept in supported:
+            mask = 0
+            for k in kept:
+                mask |= 1 << k
+            result.append(mask)
+        return result
+
+
+def _regin_supports(adjacency, num_values):
+    """
+    Regin's all-different filtering on a bipartite variable-value graph.
+
+    A maximum matching is grown with augmenting paths (an iterative DFS with
+    parent pointers, so scopes of any size are fine). A value stays in the
+    domain of a variable iff it is matched to it, lies on an even alternating
+    path from a free value, or lies on an even alternating cycle (same strongly
+    connected component of the alternating graph).
+
+    Args:
+        adjacency (list): for every variable, the ids (0..num_values-1) of the values in its domain
+        num_values (int): number of value ids
+
+    Returns:
+        list: for every variable, the ids of its supported values (in the order of `adjacency`),
+              or None if there is no matching that covers all variables
+    """
+    n = len(adjacency)
+    match = [-1] * n
+    owner = [-1] * num_values
+    for i, adj in enumerate(adjacency):
+        for v in adj:
+            if owner[v] < 0:
+                match[i] = v
+                owner[v] = i
+                break
+
+    # augmenting paths: DFS over variables, entering a variable through the value matched to it
+    seen = [0] * num_values
+    via = [0] * num_values
+    ptr = [0] * n
+    for root in range(n):
+        if match[root] >= 0:
+            continue
+        stamp = root + 1
+        stack = [root]
+        ptr[root] = 0
+        free = -1
+        while stack:
+            u = stack[-1]
+            adj = adjacency[u]
+            if ptr[u] == len(adj):
+                stack.pop()
+                continue
+            v = adj[ptr[u]]
+            ptr[u] += 1
+            if seen[v] == stamp:
+                continue
+            seen[v] = stamp
+            via[v] = u
+            w = owner[v]
+            if w < 0:
+                free = v
+                break
+            ptr[w] = 0
+            stack.append(w)
+        if free < 0:
+            return None
+        # flip the path back to the root
+        v = free
+        while True:
+            u = via[v]
+            previous = match[u]
+            match[u] = v
+            owner[v] = u
+            if u == root:
+                break
+            v = previous
+
+    # alternating graph: matched edges variable -> value, the others value -> variable
+    succs = [[n + match[i]] for i in range(n)] + [[] for _ in range(num_values)]
+    for i, adj in enumerate(adjacency):
+        for v in adj:
+            if v != match[i]:
+                succs[n + v].append(i)
+
+    # values reachable from a free value lie on even alternating paths
+    reachable = [False] * len(succs)
+    stack = [n + v for v in range(num_values) if owner[v] < 0]
+    for node in stack:
+        reachable[node] = True
+    while stack:
+        node = stack.pop()
+        for nxt in succs[node]:
+            if not reachable[nxt]:
+                reachable[nxt] = True
+                stack.append(nxt)
+
+    # edges inside a strongly connected component lie on even alternating cycles;
+    # only edges to unreachable values are in question, and a cycle through one
+    # of them cannot touch a reachable node, so the SCCs are computed without those
+    if all(v == match[i] or reachable[n + v] for i, adj in enumerate(adjacency) for v in adj):
+        return [list(adj) for adj in adjacency]
+    for node, out in enumerate(succs):
+        succs[node] = [] if reachable[node] else [x for x in out if not reachable[x]]
+    scc = _strongly_connected_components(succs)
+    return [
+        [v for v in adj if v == match[i] or reachable[n + v] or scc[i] == scc[n + v]]
+        for i, adj in enumerate(adjacency)
+    ]
+
+
+def _strongly_connected_components(succs):
+    """Iterative Tarjan; returns the component id of every node of the adjacency lists `succs`."""
+    n = len(succs)
+    index = [None] * n
+    low = [0] * n
+    comp = [None] * n
+    on_stack = [False] * n
+    stack = []
+    counter = 0
+    n_comps = 0
+    for root in range(n):
+        if index[root] is not None:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, k = work.pop()
+            if k == 0:
+                index[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            if k < len(succs[node]):
+                work.append((node, k + 1))
+                nxt = succs[node][k]
+                if index[nxt] is None:
+                    work.append((nxt, 0))
+                elif on_stack[nxt]:
+                    low[node] = min(low[node], index[nxt])
+                continue
+            if low[node] == index[node]:
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp[w] = n_comps
+                    if w == node:
+                        break
+                n_comps += 1
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+    return comp
+
+
+def compile_supports(bcn, values=None):
+    """
+    Precompiles every binary constraint of a BCN into per-value support bitsets.
+
+    Bit k of a domain bitset of X stands for values[X][k], so any finite
+    domains of hashable, sortable values are supported. The constraints are
+    evaluated exactly once per value pair here, and never again during AC.
+
+    Args:
+        bcn ((domains, constraints)): The BCN to compile
+        values (dict, optional): value list (bit order) of every variable; defaults to its sorted domain
+
+    Returns:
+        (values, supports), where
+        - values maps each variable to the sorted list of its domain values
+        - supports maps each arc (X_i, X_j) to a list whose k-th entry is the bitset of values of X_j compatible with values[X_i][k]
+    """
+    domains, constraints = bcn
+    if values is None:
+        values = {var: sorted(vals) for var, vals in domains.items()}
+    supports = {}
+    for key, constraint in constraints.items():
+        if len(key) != 2:
+            continue
+        A, B = key
+        vals_A, vals_B = values[A], values[B]
+        sup_A = [0] * len(vals_A)
+        sup_B = [0] * len(vals_B)
+        for k_a, v_a in enumerate(vals_A):
+            for k_b, v_b in enumerate(vals_B):
+                if constraint(v_a, v_b):
+                    sup_A[k_a] |= 1 << k_b
+                    sup_B[k_b] |= 1 << k_a
+        supports[(A, B)] = sup_A
+        supports[(B, A)] = sup_B
+    return values, supports
+
+
+def revise_bitset(domains, supports, X_i, X_j):
+    """
+    Bitset version of `revise`: keeps the values of X_i whose support bitset intersects the domain of X_j.
+
+    Args:
+        domains (dict): bitset domain of every variable
+        supports (dict): support bitsets as computed by `compile_supports`
+        X_i (Any): descriptor of the variable X_i
+        X_j (Any): descriptor of the variable X_j
+
+    Returns:
+        (D_i', changed) with D_i' as bitset
+    """
+    D_i = domains[X_i]
+    D_j = domains[X_j]
+    sup = supports[(X_i, X_j)]
+    new_D_i = D_i
+    bits = D_i
+    while bits:
+        low = bits & -bits
+        bits ^= low
+        if not sup[low.bit_length() - 1] & D_j:
+            new_D_i ^= low
+    return new_D_i, new_D_i != D_i
+
+
+def ac3_bitset(bcn, compiled=None):
+    """
+    AC-3 on support bitsets. Works for arbitrary finite domains and binary
+    constraints, and returns the same result as `ac3`. Global constraints are
+    filtered with their own propagator, as in `ac3`.
+
+    Args:
+        bcn ((domains, constraints)): The BCN to make arc consistent (if possible)
+        compiled ((values, supports), optional): result of `compile_supports` for bcn, to reuse it across calls
+
+    Returns:
+        (bcn', feasible) as in `ac3`
+    """
+    domains, constraints = bcn
+    values, supports = compiled if compiled is not None else compile_supports(bcn)
+    bits = {}
+    for var, vals in domains.items():
+        m = 0
+        for k, v in enumerate(values[var]):
+            if v in vals:
+                m |= 1 << k
+        bits[var] = m
+
+    def _to_set(var):
+        return {v for k, v in enumerate(values[var]) if bits[var] >> k & 1}
+
+    neighbors = {var: [] for var in domains}
+    var_globals = {var: [] for var in domains}
+    global_keys = []
+    queue = deque()
+    for key in constraints:
+        if len(key) == 2:
+            A, B = key
+            neighbors[A].append(B)
+            neighbors[B].append(A)
+            queue.append((A, B))
+            queue.append((B, A))
+        else:
+            global_keys.append(key)
+            for var in key:
+                var_globals[var].append(key)
+    in_queue = set(queue)
+    global_queue = deque(global_keys)
+    in_global_queue = set(global_keys)
+
+    def _schedule(X_i, source):
+        for X_k in neighbors[X_i]:
+            if X_k != source:
+                arc = (X_k, X_i)
+                if arc not in in_queue:
+                    queue.append(arc)
+                    in_queue.add(arc)
+        for key in var_globals[X_i]:
+            if key != source and key not in in_global_queue:
+                global_queue.append(key)
+                in_global_queue.add(key)
+
+    feasible = True
+    while queue or global_queue:
+        if not queue:
+            key = global_queue.popleft()
+            in_global_queue.discard(key)
+            reduced = constraints[key].filter({var: _to_set(var) for var in key})
+            if reduced is None:
+                feasible = False
+                break
+            for var, D in reduced.items():
+                bits[var] = sum(1 << k for k, v in enumerate(values[var]) if v in D)
+                _schedule(var, key)
+            continue
+
+        X_i, X_j = queue.popleft()
+        in_queue.discard((X_i, X_j))
+
+        D_i, changed = revise_bitset(bits, supports, X_i, X_j)
+        if changed:
+            bits[X_i] = D_i
+            if not D_i:
+                feasible = False
+                break
+            _schedule(X_i, X_j)
+
+    reduced = {var: _to_set(var) for var in domains}
+    return (reduced, constraints), feasible
+
+
+class CompiledBCN:
+    """
+    A BCN with variables interned to ints and the constraint graph in CSR form.
+
+    Bit k of the domain bitset of variable i stands for `values[i][k]`. Value
+    lists are interned tuples. Variables linked by a global constraint share
+    one, so globals can be filtered on the bitsets directly, and so do
+    variables linked by a constraint function that is used for several keys.
+
+    Attributes:
+        variables (list): variable names, `index` maps them to their ids
+        values (list): value tuple of every variable
+        domains (list): domain bitset of every variable
+        indptr, indices (np.ndarray): the neighbours of variable i are indices[indptr[i]:indptr[i + 1]]
+        arc_table (np.ndarray): parallel to `indices`; for entry k with neighbour j of i,
+            `tables[arc_table[k]][b]` is the bitset of values of i that support value b of j
+        tables (list): support tables, shared by all arcs with the same constraint and value tuples
+        globals (list): (variable ids, constraint) of every non-binary constraint
+        global_indptr, global_indices (np.ndarray): the globals of variable i, in CSR form as well
+    """
+
+    def __init__(self, bcn):
+        domains, constraints = bcn
+        self.variables = list(domains)
+        self.index = {var: i for i, var in enumerate(self.variables)}
+        n = len(self.variables)
+        index = self.index
+
+        # shared value tuples for variables linked by global constraints (union-find)
+        parent = list(range(n))
+
+        def _find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # a constraint function shared by several binary keys usually is one relation (like !=)
+        # on similar domains, so its variables share the value tuple and thereby the support tables
+        uses = {}
+        for key, constraint in constraints.items():
+            if len(key) == 2:
+                uses[id(constraint)] = uses.get(id(constraint), 0) + 1
+        global_keys = [key for key in constraints if len(key) != 2]
+        linked = global_keys + [key for key, c in constraints.items() if len(key) == 2 and uses[id(c)] > 1]
+        for key in linked:
+            root = _find(index[key[0]])
+            for var in key[1:]:
+                parent[_find(index[var])] = root
+        unions = {}
+        for i, var in enumerate(self.variables):
+            unions.setdefault(_find(i), set()).update(domains[var])
+        interned = {}
+        class_values = {}
+        for root, vals in unions.items():
+            vals = tuple(sorted(vals))
+            class_values[root] = interned.setdefault(vals, vals)
+        self.values = [class_values[_find(i)] for i in range(n)]
+
+        self.domains = []
+        for i, var in enumerate(self.variables):
+            D = domains[var]
+            self.domains.append(sum(1 << k for k, v in enumerate(self.values[i]) if v in D))
+
+        # arcs (changed variable, revised variable, table id), tables deduplicated by constraint and value tuples
+        self.tables = []
+        table_ids = {}
+        rows, cols, refs = [], [], []
+
+        def _table(constraint, vals_rev, vals_chg, flip):
+            table_key = (id(constraint), id(vals_rev), id(vals_chg), flip)
+            if table_key not in table_ids:
+                table = []
+                for v_rev in vals_rev:
+                    m = 0
+                    for k, v_chg in enumerate(vals_chg):
+                        if (constraint(v_chg, v_rev) if flip else constraint(v_rev, v_chg)):
+                            m |= 1 << k
+                    table.append(m)
+                table_ids[table_key] = len(self.tables)
+                self.tables.append(table)
+            return table_ids[table_key]
+
+        for key, constraint in constraints.items():
+            if len(key) != 2:
+                continue
+            a, b = index[key[0]], index[key[1]]
+            # a changed: revise b; b changed: revise a
+            rows += [a, b]
+            cols += [b, a]
+            refs += [
+                _table(constraint, self.values[b], self.values[a], True),
+                _table(constraint, self.values[a], self.values[b], False),
+            ]
+        self.indptr, self.indices, self.arc_table = _to_csr(n, rows, cols, refs)
+
+        self.globals = [([index[var] for var in key], constraints[key]) for key in global_keys]
+        g_rows = [i for ids, _ in self.globals for i in ids]
+        g_cols = [gi for gi, (ids, _) in enumerate(self.globals) for _ in ids]
+        self.global_indptr, self.global_indices, _ = _to_csr(n, g_rows, g_cols, g_cols)
+
+    def to_sets(self, domains=None):
+        """Decodes domain bitsets (default: `self.domains`) to a dictionary of value sets."""
+        domains = self.domains if domains is None else domains
+        return {
+            var: {v for k, v in enumerate(self.values[i]) if domains[i] >> k & 1}
+            for i, var in enumerate(self.variables)
+        }
+
+    def filter_global(self, gi, domains):
+        """
+        Filters the global constraint `gi` on the bitsets `domains`.
+
+        Returns:
+            list: (variable id, new bitset) for every reduced domain, or None if the constraint is unsatisfiable
+        """
+        ids, constraint = self.globals[gi]
+        masks = [domains[i] for i in ids]
+        if hasattr(constraint, "filter_bits"):
+            reduced = constraint.filter_bits(masks)
+            if reduced is None:
+                return None
+            return [(i, new) for i, old, new in zip(ids, masks, reduced) if new != old]
+        sets = {
+            self.variables[i]: {v for k, v in enumerate(self.values[i]) if m >> k & 1}
+            for i, m in zip(ids, masks)
+        }
+        reduced = constraint.filter(sets)
+        if reduced is None:
+            return None
+        return [
+            (self.index[var], sum(1 << k for k, v in enumerate(self.values[self.index[var]]) if v in D))
+            for var, D in reduced.items()
+        ]
+
+
+def _to_csr(n, rows, cols, refs):
+    rows = np.asarray(rows, dtype=np.int64)
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    indices = np.asarray(cols, dtype=np.int32)[order]
+    data = np.asarray(refs, dtype=np.int32)[order]
+    return indptr, indices, data
+
+
+def compile_bcn(bcn):
+    """
+    Compiles a BCN into a `CompiledBCN` (int variables, CSR constraint graph, bitset domains).
+
+    Args:
+        bcn ((domains, constraints)): The BCN to compile
+
+    Returns:
+        CompiledBCN: the compiled BCN, usable by `ac3_compiled` and `mac.MACSearch`
+    """
+    return CompiledBCN(bcn)
+
+
+def ac3_compiled(compiled, domains=None):
+    """
+    AC-3 over the CSR graph of a compiled BCN: whenever the domain of a
+    variable shrinks, its neighbours are revised against it, and its global
+    constraints are filtered once the binary arcs are consistent.
+
+    Args:
+        compiled (CompiledBCN): The compiled BCN
+        domains (list, optional): domain bitsets to start from (default: `compiled.domains`); not modified
+
+    Returns:
+        (domains', feasible), where domains' is the list of reduced domain bitsets
+    """
+    dom = list(compiled.domains if domains is None else domains)
+    indptr = compiled.indptr.tolist()
+    indices = compiled.indices.tolist()
+    arc_table = compiled.arc_table.tolist()
+    tables = compiled.tables
+    global_indptr = compiled.global_indptr.tolist()
+    global_indices = compiled.global_indices.tolist()
+
+    queue = list(range(len(dom)))
+    in_queue = [True] * len(dom)
+    global_queue = list(range(len(compiled.globals)))
+    in_global_queue = [True] * len(compiled.globals)
+    while queue or global_queue:
+        if not queue:
+            gi = global_queue.pop()
+            in_global_queue[gi] = False
+            reduced = compiled.filter_global(gi, dom)
+            if reduced is None:
+                return dom, False
+            for j, new in reduced:
+                dom[j] = new
+                if not in_queue[j]:
+                    in_queue[j] = True
+                    queue.append(j)
+            continue
+        i = queue.pop()
+        in_queue[i] = False
+        D_i = dom[i]
+        for k in range(indptr[i], indptr[i + 1]):
+            j = indices[k]
+            sup = tables[arc_table[k]]
+            D_j = dom[j]
+            new_D_j = D_j
+            bits = D_j
+            while bits:
+                low = bits & -bits
+                bits ^= low
+                if not sup[low.bit_length() - 1] & D_i:
+                    new_D_j ^= low
+            if new_D_j != D_j:
+                if not new_D_j:
+                    dom[j] = 0
+                    return dom, False
+                dom[j] = new_D_j
+                if not in_queue[j]:
+                    in_queue[j] = True
+                    queue.append(j)
+        for k in range(global_indptr[i], global_indptr[i + 1]):
+            gi = global_indices[k]
+            if not in_global_queue[gi]:
+                in_global_queue[gi] = True
+                global_queue.append(gi)
+    return dom, True
+
+
 def _detect_sudoku_groups(domains):
     """Detect Sudoku row/col/block groups from (row, col) variable names."""
     vars_list = list(domains.keys())
@@ -107,30 +863,97 @@ def _detect_sudoku_groups(domains):
     return groups
 
 
-def get_general_constructive_search_for_bcn(bcn, phi=None):
+def get_general_constructive_search_for_bcn(
+    bcn,
+    phi=None,
+    groups=None,
+    phi_mask=None,
+    heuristic="mrv",
+    restarts=None,
+    restart_base=100,
+    restart_factor=1.5,
+    random_state=None,
+    limit=None,
+):
     """
         Generates a GeneralConstructiveSearch that can find a solution in the search space described by the BCN.
 
     Args:
         bcn ((domains, constraints)): The BCN in which we look for a solution.
         phi (func, optional): Function that takes a dictionary of domains (variables are keys) and selects the variable to fix next.
+        groups (list, optional): Explicit all-different groups (iterables of variables) used for singleton, hidden single and naked pair propagation.
+            Defaults to the variables of the `AllDifferent` constraints in the BCN, or to the rows, columns and blocks detected from (row, col) names.
+        phi_mask (func, optional): Like `phi`, but takes the state itself, i.e. a dictionary of domain bitmasks where bit k stands for `search.values[k]`.
+        heuristic (str): Built-in variable ordering if neither `phi` nor `phi_mask` is given: "mrv" (smallest domain) or
+            "dom/wdeg" (smallest domain size divided by the summed weights of the constraints of the variable; a constraint's weight is
+            increased every time it wipes out a domain).
+        restarts (str, optional): Restart policy, "luby" or "geometric". The search restarts from the root once the number of dead ends
+            since the last restart exceeds `restart_base` times the i-th Luby number, or `restart_base * restart_factor ** i`, respectively.
+            Constraint weights are kept across restarts.
+        restart_base (int): Number of dead ends before the first restart.
+        restart_factor (float): Growth factor of the geometric policy.
+        random_state (np.random.RandomState, optional): Random state for tie-breaking between equally good variables; ties are re-drawn on
+            every restart. Defaults to `np.random.RandomState(0)` if restarts are enabled, and to deterministic ties otherwise.
+        limit (int, optional): Keep searching until `limit` solutions are found (`search.solution_count`); `search.best` stays the first one.
 
     Returns:
         (search, decoder), where
          - search is a GeneralConstructiveSearch object
          - decoder is a function to decode a node to an assignment
     """
+    if heuristic not in {"mrv", "dom/wdeg"}:
+        raise ValueError("heuristic must be 'mrv' or 'dom/wdeg'")
+    if restarts not in {None, "luby", "geometric"}:
+        raise ValueError("restarts must be None, 'luby' or 'geometric'")
+    if restarts is not None and limit is not None:
+        raise ValueError("restarts revisit solutions and cannot be combined with a solution limit")
+    if restarts is not None and random_state is None:
+        random_state = np.random.RandomState(0)
     domains, constraints = bcn
 
+    # --- Binary constraints that are != on the domains vs. other relations ---
+    # != constraints are propagated by clearing the fixed value's bit; every
+    # other relation filters the neighbour against its supports of the fixed value
+    keys_of = {}
+    for key, c in constraints.items():
+        if len(key) == 2:
+            keys_of.setdefault(c, []).append(key)
+    relations = {}
+    for c, keys in keys_of.items():
+        # a function shared by many keys (like !=) is checked once on the union of their domains
+        left = set().union(*(domains[A] for A, _ in keys))
+        right = set().union(*(domains[B] for _, B in keys))
+        if all(bool(c(a, b)) == (a != b) for a in left for b in right):
+            continue
+        for A, B in keys:
+            if len(keys) > 1 and all(bool(c(a, b)) == (a != b) for a in domains[A] for b in domains[B]):
+                continue
+            relations.setdefault((A, B), []).append((c, False))
+            relations.setdefault((B, A), []).append((c, True))
+
+    # --- Declared all-different groups (explicit, global constraints or detected) ---
+    if groups is None:
+        groups = [key for key, c in constraints.items() if isinstance(c, AllDifferent)]
+        if not groups and not relations:
+            groups = _detect_sudoku_groups(domains) or []
+    groups = [tuple(group) for group in groups]
+    var_groups = {var: [] for var in domains}
+    for gi, group in enumerate(groups):
+        for var in group:
+            if var not in var_groups:
+                raise ValueError(f"group variable {var!r} is not a variable of the BCN")
+            var_groups[var].append(gi)
+
     # --- Precompute neighbour lists (once) ---
     _nbr_set = {var: set() for var in domains}
-    for (A, B) in constraints:
-        _nbr_set[A].add(B)
-        _nbr_set[B].add(A)
+    for key in [key for key in constraints if key not in relations] + groups:
+        for A in key:
+            _nbr_set[A].update(key)
+            _nbr_set[A].discard(A)
     neighbors = {var: list(nbs) for var, nbs in _nbr_set.items()}
-
-    # --- Detect Sudoku groups for advanced propagation ---
-    groups = _detect_sudoku_groups(domains)
+    related = {var: [] for var in domains}
+    for A, B in relations:
+        related[A].append(B)
 
     # --- Apply AC-3 to get initial reduced domains ---
     reduced_bcn, feasible = ac3(bcn)
@@ -141,28 +964,71 @@ def get_general_constructive_search_for_bcn(bcn, phi=None):
         search.OPEN = []
         return search, lambda n: n
 
-    # --- Bitmask helpers ---
+    # --- Bitmask helpers: bit k stands for values[k], shared by all variables ---
+    values = sorted(set().union(*reduced_bcn[0].values()))
+    value_bit = {v: 1 << k for k, v in enumerate(values)}
+
     def _to_bitmask(vals):
         m = 0
         for v in vals:
-            m |= 1 << (v - 1)
+            m |= value_bit[v]
         return m
 
     def _from_bitmask(m):
         vals = set()
         while m:
-            lsb = m & -m
-            vals.add(lsb.bit_length())
+            vals.add(values[lowbit_index(m)])
             m &= m - 1
         return vals
 
-    _popcount = lambda x: bin(x).count('1')
+    _popcount = popcount
+    stats = {"nodes": 0, "propagations": 0, "failures": 0, "restarts": 0}
+
+    supports = {}
+
+    def _supports(var, nb, val_bit):
+        """Bitmask of the values of `nb` that every relation between `var` and `nb` allows next to the value of `val_bit`."""
+        arc = (var, nb, val_bit)
+        if arc not in supports:
+            v = values[lowbit_index(val_bit)]
+            m = 0
+            for w in reduced_bcn[0][nb]:
+                if all(c(w, v) if swap else c(v, w) for c, swap in relations[(var, nb)]):
+                    m |= value_bit[w]
+            supports[arc] = m
+        return supports[arc]
+
+    # --- Constraint weights for dom/wdeg (start at 1, bumped on wipe-outs) ---
+    weights = {}
+    wdeg = {var: 0 for var in domains}
+    for scope in list(constraints) + groups:
+        weights[scope] = 1
+        for var in scope:
+            wdeg[var] += 1
+
+    def _bump(scope):
+        weights[scope] += 1
+        for var in scope:
+            wdeg[var] += 1
+
+    def _scope_of(a, b):
+        """The constraint that makes `a` and `b` neighbours (a binary constraint or a group)."""
+        for key in ((a, b), (b, a)):
+            if key in constraints:
+                return key
+        for gi in var_groups[a]:
+            if b in groups[gi]:
+                return groups[gi]
+        for key in constraints:
+            if a in key and b in key:
+                return key
+        return None
 
     # --- Convert initial domains to bitmasks ---
     w0 = {var: _to_bitmask(vals) for var, vals in reduced_bcn[0].items()}
 
-    # --- Fast singleton propagation (equivalent to AC-3 for all-diff) ---
-    def _propagate(state, fixed_var):
+    # --- Fast singleton propagation (equivalent to AC-3 for all-diff, forward checking for other relations) ---
+    def _propagate(state, fixed_var, mark=None):
         queue = [fixed_var]
         while queue:
             var = queue.pop()
@@ -172,90 +1038,156 @@ def get_general_constructive_search_for_bcn(bcn, phi=None):
                 if nb_mask & val_bit:
                     new_mask = nb_mask & ~val_bit
                     if new_mask == 0:
+                        _bump(_scope_of(var, nb))
                         return None
                     state[nb] = new_mask
+                    stats["propagations"] += 1
+                    if mark is not None:
+                        mark(nb)
+                    if not (new_mask & (new_mask - 1)):
+                        queue.append(nb)
+            for nb in related[var]:
+                nb_mask = state[nb]
+                new_mask = nb_mask & _supports(var, nb, val_bit)
+                if new_mask != nb_mask:
+                    if new_mask == 0:
+                        _bump(_scope_of(var, nb))
+                        return None
+                    state[nb] = new_mask
+                    stats["propagations"] += 1
+                    if mark is not None:
+                        mark(nb)
                     if not (new_mask & (new_mask - 1)):
                         queue.append(nb)
         return state
 
     # --- Advanced propagation: hidden singles + naked pairs ---
-    def _advanced(state):
-        if not groups:
-            return state
+    # Hidden singles need every value of the group to be used, i.e. as many
+    # values as variables; naked pairs are valid for any all-different group.
+    tight = []
+    for group in groups:
+        union = 0
+        for var in group:
+            union |= w0[var]
+        tight.append(_popcount(union) == len(group))
+
+    def _group_rules(state, gi, mark):
+        """Applies hidden singles and naked pairs to one group until neither changes it."""
+        group = groups[gi]
+        size = len(group)
         progress = True
         while progress:
             progress = False
-            for group in groups:
-                unfixed = []
-                fixed_bits = 0
-                for var in group:
-                    m = state[var]
-                    if m & (m - 1):
-                        unfixed.append(var)
-                    else:
-                        fixed_bits |= m
-                if not unfixed:
-                    continue
+            unfixed = []
+            fixed_bits = 0
+            once = 0
+            twice = 0
+            for var in group:
+                m = state[var]
+                if m & (m - 1):
+                    unfixed.append(var)
+                    twice |= once & m
+                    once |= m
+                else:
+                    fixed_bits |= m
+            if not unfixed:
+                return state
 
-                # -- Hidden singles --
-                all_unfixed = 0
-                for var in unfixed:
-                    all_unfixed |= state[var]
-                needed = all_unfixed & ~fixed_bits
-                remaining = needed
-                while remaining:
-                    bit = remaining & -remaining
-                    remaining &= remaining - 1
-                    cnt = 0
-                    candidate = None
+            # -- Hidden singles: values of the group that only one unfixed variable can take --
+            if tight[gi]:
+                if _popcount(once | fixed_bits) < size:
+                    _bump(group)
+                    return None
+                singles = once & ~twice & ~fixed_bits
+                while singles:
+                    bit = singles & -singles
+                    singles ^= bit
                     for var in unfixed:
-                        if state[var] & bit:
-                            cnt += 1
-                            candidate = var
-                            if cnt > 1:
-                                break
-                    if cnt == 0:
-                        return None
-                    if cnt == 1 and state[candidate] != bit:
-                        state[candidate] = bit
-                        state = _propagate(state, candidate)
-                        if state is None:
-                            return None
-                        progress = True
-                        break
+                        m = state[var]
+                        if m & bit:
+                            if m != bit:
+                                state[var] = bit
+                                stats["propagations"] += 1
+                                mark(var)
+                                state = _propagate(state, var, mark)
+                                if state is None:
+                                    return None
+                                progress = True
+                            break
                 if progress:
-                    break
+                    continue
 
-                # -- Naked pairs --
-                for i in range(len(unfixed)):
-                    mi = state[unfixed[i]]
-                    if _popcount(mi) != 2:
+            # -- Naked pairs: two variables with the same two values --
+            seen_pairs = {}
+            for var in unfixed:
+                m = state[var]
+                rest = m & (m - 1)
+                if not rest or rest & (rest - 1):
+                    continue
+                if m not in seen_pairs:
+                    seen_pairs[m] = var
+                    continue
+                other = seen_pairs[m]
+                for nb in unfixed:
+                    if nb is var or nb is other:
                         continue
-                    for j in range(i + 1, len(unfixed)):
-                        if state[unfixed[j]] == mi:
-                            for k in range(len(unfixed)):
-                                if k != i and k != j:
-                                    old = state[unfixed[k]]
-                                    nw = old & ~mi
-                                    if nw != old:
-                                        if nw == 0:
-                                            return None
-                                        state[unfixed[k]] = nw
-                                        progress = True
-                                        if not (nw & (nw - 1)):
-                                            state = _propagate(state, unfixed[k])
-                                            if state is None:
-                                                return None
-                            if progress:
-                                break
-                    if progress:
-                        break
-                if progress:
-                    break
+                    old = state[nb]
+                    nw = old & ~m
+                    if nw != old:
+                        if nw == 0:
+                            _bump(group)
+                            return None
+                        state[nb] = nw
+                        stats["propagations"] += 1
+                        mark(nb)
+                        progress = True
+                        if not (nw & (nw - 1)):
+                            state = _propagate(state, nb, mark)
+                            if state is None:
+                                return None
+        return state
+
+    def _advanced(state, fixed_var=None):
+        """
+        Propagates the fixing of `fixed_var` (or everything, if None) to fixpoint.
+        Domain changes mark the groups of the changed variable as dirty, and only
+        dirty groups are (re)processed, each one to its own fixpoint.
+        """
+        queue = deque()
+        queued = [False] * len(groups)
+
+        def mark(var):
+            for gi in var_groups[var]:
+                if not queued[gi]:
+                    queued[gi] = True
+                    queue.append(gi)
+
+        if fixed_var is None:
+            queue.extend(range(len(groups)))
+            queued = [True] * len(groups)
+        else:
+            mark(fixed_var)
+            state = _propagate(state, fixed_var, mark)
+            if state is None:
+                return None
+        while queue:
+            gi = queue.popleft()
+            state = _group_rules(state, gi, mark)
+            if state is None:
+                return None
+            # the group is at its fixpoint, including its own changes
+            queued[gi] = False
         return state
 
-    # --- Apply advanced propagation to initial state ---
-    w0 = _advanced(w0)
+    # --- Apply singleton and advanced propagation to initial state ---
+    for var in list(w0):
+        m = w0[var]
+        if not (m & (m - 1)):
+            w0 = _propagate(w0, var)
+            if w0 is None:
+                break
+    if w0 is not None:
+        w0 = _advanced(w0)
     if w0 is None:
         search = GeneralConstructiveSearch(
             w0={}, succ=lambda n: [], goal=lambda n: False
@@ -263,10 +1195,19 @@ def get_general_constructive_search_for_bcn(bcn, phi=None):
         search.OPEN = []
         return search, lambda n: n
 
-    # --- MRV variable selection ---
+    # --- Built-in variable selection (MRV or dom/wdeg, with optional random tie-breaking) ---
+    tiebreak = {}
+
+    def _shuffle_ties():
+        order = random_state.permutation(len(w0))
+        tiebreak.update(zip(w0, order.tolist()))
+
+    if random_state is not None:
+        _shuffle_ties()
+
     def _select_var(state):
         best = None
-        best_count = 17
+        best_count = len(values) + 1
         for var, mask in state.items():
             if mask & (mask - 1):
                 c = _popcount(mask)
@@ -277,15 +1218,54 @@ def get_general_constructive_search_for_bcn(bcn, phi=None):
                         return best
         return best
 
-    use_phi = phi is not None
+    def _select_var_scored(state):
+        best = None
+        best_key = None
+        use_wdeg = heuristic == "dom/wdeg"
+        for var, mask in state.items():
+            if mask & (mask - 1):
+                key = (
+                    _popcount(mask) / wdeg[var] if use_wdeg and wdeg[var] else _popcount(mask),
+                    tiebreak.get(var, 0),
+                )
+                if best_key is None or key < best_key:
+                    best_key = key
+                    best = var
+        return best
+
+    if phi_mask is not None:
+        select = phi_mask
+    elif phi is not None:
+        def select(state):
+            return phi({var: _from_bitmask(mask) for var, mask in state.items()})
+    elif heuristic == "mrv" and random_state is None:
+        select = _select_var
+    else:
+        select = _select_var_scored
+
+    # --- Restart policy: dead ends allowed before the next restart ---
+    restart = {"limit": None, "failures": 0}
+
+    def _next_limit():
+        i = stats["restarts"]
+        if restarts == "luby":
+            return restart_base * luby(i + 1)
+        return restart_base * restart_factor ** i
+
+    if restarts is not None:
+        restart["limit"] = _next_limit()
 
     # --- Successor function ---
     def succ(state):
-        if use_phi:
-            doms = {var: _from_bitmask(mask) for var, mask in state.items()}
-            var = phi(doms)
-        else:
-            var = _select_var(state)
+        if restart["limit"] is not None and restart["failures"] >= restart["limit"]:
+            # drop the open nodes and start over from the root (weights are kept)
+            stats["restarts"] += 1
+            restart["failures"] = 0
+            restart["limit"] = _next_limit()
+            _shuffle_ties()
+            search.OPEN.clear()
+            return [w0]
+        var = select(state)
         if var is None:
             return []
         mask = state[var]
@@ -296,11 +1276,11 @@ def get_general_constructive_search_for_bcn(bcn, phi=None):
             bits &= bits - 1
             ns = state.copy()
             ns[var] = bit
-            ns = _propagate(ns, var)
-            if ns is None:
-                continue
-            ns = _advanced(ns)
+            stats["nodes"] += 1
+            ns = _advanced(ns, var)
             if ns is None:
+                stats["failures"] += 1
+                restart["failures"] += 1
                 continue
             successors.append(ns)
         return successors
@@ -314,12 +1294,83 @@ def get_general_constructive_search_for_bcn(bcn, phi=None):
 
     # --- Decoder ---
     def decoder(state):
-        return {var: state[var].bit_length() for var in state}
+        return {var: values[lowbit_index(state[var])] for var in state}
 
-    search = GeneralConstructiveSearch(w0=w0, succ=succ, goal=goal)
+    search = GeneralConstructiveSearch(w0=w0, succ=succ, goal=goal, limit=limit)
+    search.stats = stats
+    search.values = values
+    search.weights = weights
     return search, decoder
 
 
+def count_solutions_for_bcn(bcn, limit=2, use_cache=True, **kwargs):
+    """
+    Counts the solutions of a BCN, stopping as soon as `limit` are found
+    (limit=2 answers "is the solution unique?" at about the cost of one more solve).
+
+    The count runs on the propagating bitmask search of `get_general_constructive_search_for_bcn`.
+    With `use_cache`, sub-problems are fingerprinted by the domains of their unfixed
+    variables (fixed values are already propagated to their neighbours), and a
+    fingerprint that was counted before is not expanded again. Binary constraints
+    other than != are forward-checked, so any mix of relations is counted exactly.
+
+    Args:
+        bcn ((domains, constraints)): The BCN whose solutions are counted.
+        limit (int): Number of solutions after which counting stops.
+        use_cache (bool): Whether to reuse the counts of sub-problems with the same fingerprint.
+        **kwargs: Further options of `get_general_constructive_search_for_bcn` (e.g. `groups`, `heuristic`; restarts are not allowed).
+
+    Returns:
+        int: the number of solutions if it is below `limit`, and `limit` otherwise
+    """
+    if not use_cache:
+        search, _ = get_general_constructive_search_for_bcn(bcn, limit=limit, **kwargs)
+        while search.active:
+            search.step()
+        return min(search.solution_count, limit)
+
+    search, _ = get_general_constructive_search_for_bcn(bcn, **kwargs)
+    if kwargs.get("restarts") is not None:
+        raise ValueError("restarts revisit solutions and cannot be combined with counting")
+    if not search.OPEN:
+        return 0
+    succ, goal = search.succ, search.goal
+    cache = {}
+
+    def _fingerprint(state):
+        return frozenset((var, m) for var, m in state.items() if m & (m - 1))
+
+    # explicit DFS stack of [state, children iterator, count so far, fingerprint]
+    stack = [[search.w0, None, 0, None]]
+    total = 0
+    while stack:
+        frame = stack[-1]
+        result = None
+        if frame[1] is None:
+            state = frame[0]
+            if goal(state):
+                result = 1
+            else:
+                frame[3] = _fingerprint(state)
+                result = cache.get(frame[3])
+                if result is None:
+                    frame[1] = iter(succ(state))
+        if result is None:
+            child = next(frame[1], None) if frame[2] < limit else None
+            if child is not None:
+                stack.append([child, None, 0, None])
+                continue
+            # counts that reached the limit are stored capped, which is all a parent needs
+            result = min(frame[2], limit)
+            cache[frame[3]] = result
+        stack.pop()
+        if stack:
+            stack[-1][2] += result
+        else:
+            total = result
+    return min(total, limit)
+
+
 def get_binarized_constraints_for_all_diff(domains):
     """
         Derives all binary constraints that are necessary to make sure that all variables given in `domains` will have different values.
@@ -337,3 +1388,17 @@ def get_binarized_constraints_for_all_diff(domains):
         for j in range(i + 1, len(variables)):
             constraints[(variables[i], variables[j])] = _neq
     return constraints
+
+
+def get_global_constraint_for_all_diff(domains):
+    """
+        Derives a single global constraint that makes sure that all variables given in `domains` will have different values.
+
+    Args:
+        domains (dict): dictionary where keys are variable names and values are lists of possible values for the respective variable.
+
+    Returns:
+        dict: dictionary with the sorted tuple of variable names as only key and the `AllDifferent` constraint over them as value
+    """
+    variables = tuple(sorted(domains.keys()))
+    return {variables: AllDifferent(variables)}
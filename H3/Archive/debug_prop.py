@@ -22,7 +22,7 @@ board_16 = np.array([
     [12,0,6,0,0,0,0,2,5,0,0,0,0,0,3,0],
 ])
 
-bcn = get_bcn_for_sudoku(board_16)
+bcn = get_bcn_for_sudoku(board_16, binarized=True)
 reduced, feasible = ac3(bcn)
 domains = reduced[0]
 
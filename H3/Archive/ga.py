@@ -1,23 +1,91 @@
 import functools
+import heapq
+
+import numpy as np
+
+SCHEMES = ("all_pairs", "tournament", "steady_state", "mu_plus_lambda", "mu_comma_lambda")
 
 
 class GeneticSearch:
     """
     Optimizes a set of candidates explorable through crossovers and mutations.
 
-    Which candidate is better is determined with the `better` function
+    Which candidate is better is determined with the `better` function, or,
+    if a `fitness` function is given, by smaller fitness values. With a
+    fitness function, every individual is evaluated exactly once and its
+    value is kept next to it in `fitnesses`, so selection needs no pairwise
+    comparisons.
+
+    The `scheme` determines how a generation is formed:
+      - "all_pairs": every pair of the population is crossed, and the best
+        `population_size` of parents and offspring survive (P(P-1) offspring).
+      - "tournament": `offspring_size` offspring of k-tournament parents
+        replace the population, except for the best parent (elitism); with
+        fewer than `population_size` - 1 offspring, the best parents keep
+        the remaining places.
+      - "steady_state": every offspring of k-tournament parents replaces the
+        worst individual of the population if it is better. `offspring_size`
+        defaults to 2 here (one crossover per step), so children join the
+        parent pool right away; all offspring of a step are bred before any
+        of them is inserted, so with lambda close to mu the scheme behaves
+        like "mu_plus_lambda".
+      - "mu_plus_lambda": the best `population_size` (mu) of the parents and
+        `offspring_size` (lambda, by default mu) offspring of k-tournament parents survive.
+      - "mu_comma_lambda": the best mu of the lambda offspring survive (lambda >= mu).
+    All schemes but "all_pairs" cost O(offspring_size) crossovers per generation.
+
+    With `batch=True`, the hooks work on whole populations stored as one
+    2-D array with an individual per row: init(n) returns the (n, ...)
+    array, crossover(parents1, parents2) returns the offspring of the
+    row-wise pairs of two parent arrays, mutate(individuals) returns mutant
+    copies of all rows, and fitness(individuals) returns the vector of their
+    fitness values. Selection then works on that vector with numpy; a
+    fitness function is required.
     """
 
-    def __init__(self, init, crossover, mutate, better, population_size):
+    def __init__(
+        self,
+        init,
+        crossover,
+        mutate,
+        better,
+        population_size,
+        fitness=None,
+        scheme="all_pairs",
+        offspring_size=None,
+        tournament_size=3,
+        random_state=None,
+        batch=False,
+    ):
         self.init = init
         self.crossover = crossover
         self.mutate = mutate
         self.better = better
         self.population_size = population_size
+        self.fitness = fitness
+        self.scheme = scheme
+        if offspring_size is None:
+            offspring_size = 2 if scheme == "steady_state" else population_size
+        self.offspring_size = offspring_size
+        self.tournament_size = tournament_size
+        self.random_state = np.random.RandomState(0) if random_state is None else random_state
+        self.batch = batch
+        if better is None and fitness is None:
+            raise ValueError("Either better or fitness must be given.")
+        if batch and fitness is None:
+            raise ValueError("The batch mode needs a fitness function.")
+        if scheme not in SCHEMES:
+            raise ValueError(f"Unknown scheme {scheme}. Choose one of {SCHEMES}.")
+        if scheme == "mu_comma_lambda" and self.offspring_size < population_size:
+            raise ValueError("The mu_comma_lambda scheme needs offspring_size >= population_size.")
+        if self.offspring_size < 1 or tournament_size < 1:
+            raise ValueError("offspring_size and tournament_size must be positive.")
 
         # state variables
         self.population = None
+        self.fitnesses = None
         self._best = None
+        self._best_fitness = None
         self.num_solutions = 0
 
     def reset(self):
@@ -26,7 +94,17 @@ class GeneticSearch:
         """
         self.population = self.init(self.population_size)
         self._best = None
+        self._best_fitness = None
         self.num_solutions = len(self.population)
+        if self.batch:
+            self.population = np.asarray(self.population)
+            self.fitnesses = np.asarray(self.fitness(self.population), dtype=float)
+            self._update_best(self.population, self.fitnesses)
+            return
+        if self.fitness is not None:
+            self.fitnesses = [self.fitness(ind) for ind in self.population]
+            self._update_best(self.population, self.fitnesses)
+            return
         for ind in self.population:
             if self._best is None or self.better(ind, self._best):
                 self._best = ind
@@ -35,6 +113,13 @@ class GeneticSearch:
     def best(self):
         return self._best
 
+    @property
+    def best_fitness(self):
+        """
+        Returns the fitness of the best candidate (None without a fitness function).
+        """
+        return self._best_fitness
+
     @property
     def active(self):
         """
@@ -42,17 +127,136 @@ class GeneticSearch:
         """
         return True
 
+    def emigrants(self, k):
+        """
+        Returns the k best individuals of the population (e.g., to migrate them to another population).
+        """
+        ranking = self._ranking(self.population, self.fitnesses)[:k]
+        if self.batch:
+            return [self.population[i].copy() for i in ranking]
+        return [self.population[i] for i in ranking]
+
+    def immigrate(self, individuals):
+        """
+        Replaces the worst individuals of the population by the given ones.
+
+        Returns:
+            bool: True if global best improved by them, else False.
+        """
+        individuals = list(individuals)[: len(self.population)]
+        if not individuals:
+            return False
+        if self.batch:
+            individuals = np.asarray(individuals)
+            fitnesses = np.asarray(self.fitness(individuals), dtype=float)
+        elif self.fitness is not None:
+            fitnesses = [self.fitness(ind) for ind in individuals]
+        else:
+            fitnesses = None
+        worst = self._ranking(self.population, self.fitnesses)[len(self.population) - len(individuals):]
+        for k, i in enumerate(worst):
+            self.population[i] = individuals[k]
+            if fitnesses is not None:
+                self.fitnesses[i] = fitnesses[k]
+        return self._adopt_best(individuals, fitnesses)
+
+    def _update_best(self, individuals, fitnesses):
+        """Adopts the fittest of `individuals` as best candidate if it beats the current one."""
+        if len(individuals) == 0:
+            return False
+        if self.batch:
+            i = int(np.argmin(fitnesses))
+        else:
+            i = min(range(len(fitnesses)), key=fitnesses.__getitem__)
+        if self._best_fitness is None or fitnesses[i] < self._best_fitness:
+            # rows of a batch population are views that may be overwritten later
+            self._best = individuals[i].copy() if self.batch else individuals[i]
+            self._best_fitness = fitnesses[i]
+            return True
+        return False
+
+    def _is_better(self, individuals, fitnesses, a, b):
+        """Whether individuals[a] is better than individuals[b], by fitness if available, otherwise by `better`."""
+        if self.fitness is not None:
+            return fitnesses[a] < fitnesses[b]
+        return self.better(individuals[a], individuals[b])
+
+    def _ranking(self, individuals, fitnesses):
+        """Returns the indices of `individuals`, best first (stable for ties)."""
+        if self.fitness is not None:
+            return sorted(range(len(individuals)), key=fitnesses.__getitem__)
+        return sorted(
+            range(len(individuals)),
+            key=functools.cmp_to_key(
+                lambda a, b: -1 if self.better(individuals[a], individuals[b]) else (1 if self.better(individuals[b], individuals[a]) else 0)
+            ),
+        )
+
+    def _extreme(self, individuals, fitnesses):
+        """Index of the best of `individuals` in one linear scan."""
+        extreme = 0
+        for k in range(1, len(individuals)):
+            if self._is_better(individuals, fitnesses, k, extreme):
+                extreme = k
+        return extreme
+
+    def _best_indices(self, individuals, fitnesses, n):
+        """Indices of the best `n` of `individuals`, best first (ties keep the earlier one)."""
+        if n == 1:
+            return [self._extreme(individuals, fitnesses)]
+        if self.fitness is not None:
+            return heapq.nsmallest(n, range(len(individuals)), key=fitnesses.__getitem__)
+        return self._ranking(individuals, fitnesses)[:n]
+
+    def _tournament(self):
+        """Index of the best of `tournament_size` individuals drawn uniformly (with replacement)."""
+        contenders = self.random_state.randint(len(self.population), size=self.tournament_size)
+        winner = contenders[0]
+        for k in contenders[1:]:
+            if self._is_better(self.population, self.fitnesses, k, winner):
+                winner = k
+        return winner
+
+    def _breed(self):
+        """Produces `offspring_size` offspring of tournament-selected parents and their fitnesses (None without fitness)."""
+        pop = self.population
+        offspring = []
+        while len(offspring) < self.offspring_size:
+            children = self.crossover(pop[self._tournament()], pop[self._tournament()])
+            if self.mutate is not None:
+                children = [self.mutate(c) for c in children]
+            offspring.extend(children)
+        del offspring[self.offspring_size:]
+        self.num_solutions += len(offspring)
+        if self.fitness is None:
+            return offspring, None
+        return offspring, [self.fitness(ind) for ind in offspring]
+
+    def _adopt_best(self, offspring, fitnesses):
+        if self.fitness is not None:
+            return self._update_best(offspring, fitnesses)
+        improved = False
+        for ind in offspring:
+            if self._best is None or self.better(ind, self._best):
+                self._best = ind
+                improved = True
+        return improved
+
     def step(self):
         """
-        Executes one GA generation.
+        Executes one GA generation according to the `scheme`.
 
-        For every pair (i < j) in the population, produce two offspring via
+        With "all_pairs": for every pair (i < j) in the population, produce two offspring via
         crossover, then mutate each offspring (unless mutate is None).
         Combine parents + offspring and keep the best population_size individuals.
 
         Returns:
             bool: True if global best improved in this step, else False.
         """
+        if self.batch:
+            return self._step_batch()
+        if self.scheme != "all_pairs":
+            return self._step_with_selection()
         pop = self.population
         offspring = []
         for i in range(len(pop)):
@@ -64,6 +268,18 @@ class GeneticSearch:
 
         self.num_solutions += len(offspring)
 
+        if self.fitness is not None:
+            offspring_fitnesses = [self.fitness(ind) for ind in offspring]
+            improved = self._update_best(offspring, offspring_fitnesses)
+
+            # Elitist selection on the cached fitnesses (ties keep parents first)
+            combined = list(pop) + offspring
+            fitnesses = self.fitnesses + offspring_fitnesses
+            keep = heapq.nsmallest(self.population_size, range(len(combined)), key=fitnesses.__getitem__)
+            self.population = [combined[k] for k in keep]
+            self.fitnesses = [fitnesses[k] for k in keep]
+            return improved
+
         # Check if any offspring improves global best
         improved = False
         for ind in offspring:
@@ -81,3 +297,101 @@ class GeneticSearch:
         self.population = combined[: self.population_size]
 
         return improved
+
+    def _step_with_selection(self):
+        pop, fits = self.population, self.fitnesses
+        offspring, offspring_fitnesses = self._breed()
+        improved = self._adopt_best(offspring, offspring_fitnesses)
+        has_fitness = self.fitness is not None
+
+        if self.scheme == "steady_state":
+            # replacing the worst individual by every better child in turn leaves the best of
+            # parents and offspring (incumbents win ties), and only the worst len(offspring)
+            # parents can be replaced, so their slots are settled with one ranking
+            m = min(len(offspring), len(pop))
+            if has_fitness:
+                slots = heapq.nlargest(m, range(len(pop)), key=fits.__getitem__)
+            else:
+                slots = self._ranking(pop, None)[len(pop) - m:]
+            candidates = [pop[i] for i in slots] + offspring
+            candidate_fitnesses = [fits[i] for i in slots] + offspring_fitnesses if has_fitness else None
+            keep = self._best_indices(candidates, candidate_fitnesses, m)
+            pop = list(pop)
+            fits = list(fits) if has_fitness else None
+            for i, k in zip(slots, keep):
+                pop[i] = candidates[k]
+                if has_fitness:
+                    fits[i] = candidate_fitnesses[k]
+            self.population, self.fitnesses = pop, fits
+            return improved
+
+        if self.scheme == "tournament":
+            # generational replacement that keeps the best parent, and as many
+            # of the best parents as there are places left without offspring
+            num_parents = max(1, self.population_size - len(offspring))
+            parents = self._best_indices(pop, fits, num_parents)
+            ranking = self._best_indices(offspring, offspring_fitnesses, self.population_size - num_parents)
+            self.population = [pop[i] for i in parents] + [offspring[k] for k in ranking]
+            if has_fitness:
+                self.fitnesses = [fits[i] for i in parents] + [offspring_fitnesses[k] for k in ranking]
+            return improved
+
+        if self.scheme == "mu_plus_lambda":
+            candidates = list(pop) + offspring
+            candidate_fitnesses = fits + offspring_fitnesses if has_fitness else None
+        else:
+            candidates, candidate_fitnesses = offspring, offspring_fitnesses
+        keep = self._best_indices(candidates, candidate_fitnesses, self.population_size)
+        self.population = [candidates[k] for k in keep]
+        if has_fitness:
+            self.fitnesses = [candidate_fitnesses[k] for k in keep]
+        return improved
+
+    def _step_batch(self):
+        pop, fits = self.population, self.fitnesses
+        size = len(pop)
+        if self.scheme == "all_pairs":
+            first, second = np.triu_indices(size, 1)
+        else:
+            # tournaments for all parents at once; ties go to the first contender, as in `_tournament`
+            num_pairs = (self.offspring_size + 1) // 2
+            contenders = self.random_state.randint(size, size=(2 * num_pairs, self.tournament_size))
+            parents = contenders[np.arange(2 * num_pairs), np.argmin(fits[contenders], axis=1)]
+            first, second = parents[:num_pairs], parents[num_pairs:]
+        offspring = self.crossover(pop[first], pop[second])
+        if self.mutate is not None:
+            offspring = self.mutate(offspring)
+        if self.scheme != "all_pairs":
+            offspring = offspring[: self.offspring_size]
+        offspring_fitnesses = np.asarray(self.fitness(offspring), dtype=float)
+        self.num_solutions += len(offspring)
+        improved = self._update_best(offspring, offspring_fitnesses)
+
+        if self.scheme == "steady_state":
+            # as in `_step_with_selection`: only the worst len(offspring) slots can change
+            m = min(len(offspring), size)
+            slots = np.argpartition(fits, size - m)[size - m:]
+            candidates = np.concatenate([pop[slots], offspring])
+            candidate_fitnesses = np.concatenate([fits[slots], offspring_fitnesses])
+            keep = np.argsort(candidate_fitnesses, kind="stable")[:m]
+            pop, fits = pop.copy(), fits.copy()
+            pop[slots], fits[slots] = candidates[keep], candidate_fitnesses[keep]
+            self.population, self.fitnesses = pop, fits
+            return improved
+
+        if self.scheme == "tournament":
+            num_parents = max(1, self.population_size - len(offspring))
+            parents = np.argsort(fits, kind="stable")[:num_parents]
+            keep = np.argsort(offspring_fitnesses, kind="stable")[: self.population_size - num_parents]
+            self.population = np.concatenate([pop[parents], offspring[keep]])
+            self.fitnesses = np.concatenate([fits[parents], offspring_fitnesses[keep]])
+            return improved
+
+        if self.scheme == "mu_comma_lambda":
+            candidates, candidate_fitnesses = offspring, offspring_fitnesses
+        else:
+            candidates = np.concatenate([pop, offspring])
+            candidate_fitnesses = np.concatenate([fits, offspring_fitnesses])
+        keep = np.argsort(candidate_fitnesses, kind="stable")[: self.population_size]
+        self.population, self.fitnesses = candidates[keep], candidate_fitnesses[keep]
+        return improved
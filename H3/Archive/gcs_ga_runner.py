@@ -1,4 +1,7 @@
 from ga import GeneticSearch
+from island_ga import get_island_random_states, run_island_ga
+from local_search import candidate_lists, get_local_search
+from processes import get_fork_context, run_processes
 import numpy as np
 import time
 
@@ -82,23 +85,103 @@ def mutate(random_state, i):
     return route
 
 
+def _random_cuts(random_state, m, n):
+    """Two distinct positions c1 < c2 per row for m rows of length n."""
+    a = random_state.randint(n, size=m)
+    b = random_state.randint(n - 1, size=m)
+    b += b >= a
+    return np.minimum(a, b), np.maximum(a, b)
+
+
+def init_batch(num_locations, random_state, n):
+    """
+    Creates an initial random population of size n as one array.
+
+    Args:
+        num_locations (int): number of locations per route
+        random_state (np.random.RandomState): random state to control random behavior
+        n (int): number of individuals in population
+
+    Returns:
+        np.ndarray: (n, num_locations) int32 array with one random route per row
+    """
+    return random_state.rand(n, num_locations).argsort(axis=1).astype(np.int32)
+
+
+def crossover_batch(random_state, parents1, parents2):
+    """
+    Order Crossover (OX) of the row-wise pairs of two parent arrays at once:
+    same operator as `crossover`, with one random segment per pair.
+
+    Args:
+        random_state (np.random.RandomState): random state to control random behavior
+        parents1 (np.ndarray): (m, n) array of routes
+        parents2 (np.ndarray): (m, n) array of routes
+
+    Returns:
+        np.ndarray: (2m, n) int32 array with the first children of all pairs followed by the second ones
+    """
+    parents1 = np.asarray(parents1, dtype=np.int32)
+    parents2 = np.asarray(parents2, dtype=np.int32)
+    m, n = parents1.shape
+    if n <= 1 or m == 0:
+        return np.concatenate([parents1, parents2])
+    c1, c2 = _random_cuts(random_state, m, n)
+    # Ensure segment doesn't cover entire route (would produce trivial copies)
+    c2 -= c2 - c1 >= n - 1
+    rows = np.arange(m)[:, None]
+    positions = np.arange(n)
+    in_segment = (positions >= c1[:, None]) & (positions <= c2[:, None])
+    # free positions in fill order: after the segment, wrapping around to the front
+    rotated = (c2[:, None] + 1 + positions) % n
+    fill_positions = rotated[~in_segment[rows, rotated]]
+    fill_rows = np.repeat(np.arange(m), n - (c2 - c1 + 1))
+
+    def _make_children(donor, filler):
+        child = np.where(in_segment, donor, 0)
+        placed = np.zeros((m, n), dtype=bool)
+        placed[rows, donor] = in_segment
+        # rows keep their order when flattened, so fill values and positions line up
+        child[fill_rows, fill_positions] = filler[~placed[rows, filler]]
+        return child
+
+    return np.concatenate([_make_children(parents1, parents2), _make_children(parents2, parents1)])
+
+
+def mutate_batch(random_state, routes):
+    """
+    Inversion mutation of every row at once: reverses one random segment of
+    length >= 2 per route, like `mutate`.
+
+    Args:
+        random_state (np.random.RandomState): random state to control random behavior
+        routes (np.ndarray): (m, n) array of routes
+
+    Returns:
+        np.ndarray: (m, n) array with a mutant copy of every route
+    """
+    routes = np.asarray(routes)
+    m, n = routes.shape
+    if n <= 1 or m == 0:
+        return routes.copy()
+    c1, c2 = _random_cuts(random_state, m, n)
+    positions = np.arange(n)
+    in_segment = (positions >= c1[:, None]) & (positions <= c2[:, None])
+    source = np.where(in_segment, (c1 + c2)[:, None] - positions, positions)
+    return np.take_along_axis(routes, source, axis=1)
+
+
 # ---------------------------------------------------------------------------
 # Competition-grade helpers used by run_genetic_search_for_gcs
 # ---------------------------------------------------------------------------
 
 def _get_distance_matrix(gcs):
-    """Get or build the distance matrix for fast delta evaluations."""
+    """Get or build (by broadcasting) the distance matrix for fast delta evaluations."""
     if hasattr(gcs, "distances"):
         return gcs.distances
-    n = len(gcs.locations)
-    dist = np.zeros((n, n))
-    for i in range(n):
-        for j in range(i):
-            d = np.linalg.norm(
-                np.array(gcs.locations[i]) - np.array(gcs.locations[j])
-            )
-            dist[i, j] = dist[j, i] = d
-    return dist
+    locations = np.asarray(gcs.locations, dtype=float)
+    diff = locations[:, None, :] - locations[None, :, :]
+    return np.sqrt((diff * diff).sum(axis=-1))
 
 
 def _two_opt(route, dist):
@@ -128,24 +211,80 @@ def _two_opt(route, dist):
     return best
 
 
-def _nearest_neighbor(dist, n, start):
-    """Greedy nearest-neighbour heuristic starting from *start*."""
-    visited = set([start])
+def _get_candidates(gcs, dist, k=10):
+    """The k nearest other cities of every city (closest first), from the instance if it provides them."""
+    if hasattr(gcs, "get_candidates"):
+        return gcs.get_candidates(k)
+    return candidate_lists(dist, k)
+
+
+def _get_local_search(gcs, dist, candidates, max_depth=0):
+    """Sets up the neighbour-list 2-opt/Or-opt search, using the instance's coordinates if it has them."""
+    return get_local_search(dist, candidates, coordinates=getattr(gcs, "coordinates", None), max_depth=max_depth)
+
+
+def _broken_edge_ends(old, new):
+    """Cities of `new` that lost a neighbour they had in `old` (the ends of the edges a perturbation introduced)."""
+    n = len(old)
+    if n < 2:
+        return list(new)
+    old = np.asarray(old)
+    new = np.asarray(new)
+    succ = np.full(n, -1)
+    succ[old[:-1]] = old[1:]
+    a, b = new[:-1], new[1:]
+    broken = (succ[a] != b) & (succ[b] != a)
+    ends = set(a[broken].tolist()) | set(b[broken].tolist())
+    return list(ends | {int(new[0]), int(new[-1])})
+
+
+def _nearest_neighbor(dist, n, start, candidates, deadline=None):
+    """
+    Greedy nearest-neighbour heuristic starting from *start*.
+
+    The first unvisited city of the current city's candidate list (lists of
+    the nearest cities, closest first) is the nearest unvisited city, so the
+    distances to all unvisited cities are only computed, in one vectorized
+    row lookup, once every candidate has been visited. Once `deadline` has
+    passed, the route is completed without those lookups: the next city is
+    then the unvisited one with the smallest index.
+    """
+    visited = bytearray(n)
+    visited[start] = 1
     route = [start]
     cur = start
-    for _ in range(n - 1):
-        best_j = -1
-        best_d = float("inf")
-        for j in range(n):
-            if j not in visited and dist[cur, j] < best_d:
-                best_d = dist[cur, j]
-                best_j = j
-        route.append(best_j)
-        visited.add(best_j)
-        cur = best_j
+    late = False
+    first_unvisited = 0
+    for step in range(1, n):
+        if deadline is not None and not late and step % 256 == 0:
+            late = time.time() >= deadline
+        nxt = -1
+        for j in candidates[cur]:
+            if not visited[j]:
+                nxt = j
+                break
+        if nxt < 0 and late:
+            while visited[first_unvisited]:
+                first_unvisited += 1
+            nxt = first_unvisited
+        elif nxt < 0:
+            unvisited = np.flatnonzero(np.frombuffer(visited, dtype=np.uint8) == 0)
+            nxt = int(unvisited[np.argmin(dist[cur, unvisited])])
+        route.append(nxt)
+        visited[nxt] = 1
+        cur = nxt
     return route
 
 
+def _seed_starts(n, max_steps=10 ** 6):
+    """
+    Start cities of the nearest-neighbour seeds: every city of small instances,
+    and evenly spread ones that take about `max_steps` construction steps in
+    total on large instances (at least one).
+    """
+    return list(range(0, n, max(1, -(-n * n // max_steps))))
+
+
 def _double_bridge(route, random_state):
     """
     Double-bridge perturbation: splits the route into four segments and
@@ -164,16 +303,101 @@ def _double_bridge(route, random_state):
     return route[:a] + route[c:] + route[b:c] + route[a:b]
 
 
+def _iterated_local_search(gcs, improve, start, random_state, deadline, report):
+    """
+    ILS main loop with random restarts until `deadline`: double-bridge
+    perturbation + local search, restarting from a fresh shuffle after 20
+    perturbations without improvement. Calls `report(route)` with every
+    accepted improvement and every restart.
+    """
+    locations = list(range(len(gcs.locations)))
+    current = list(start) if start else locations
+    current_cost = gcs.get_cost_of_route(current) if start else float("inf")
+    ils_stale = 0
+
+    while time.time() < deadline:
+        perturbed = _double_bridge(current, random_state)
+        improved = improve(perturbed, _broken_edge_ends(current, perturbed), deadline)
+        imp_cost = gcs.get_cost_of_route(improved)
+
+        if imp_cost < current_cost:
+            current = improved
+            current_cost = imp_cost
+            report(current)
+            ils_stale = 0
+        else:
+            ils_stale += 1
+            if ils_stale > 20:
+                # Random restart: fresh shuffle + local search
+                perm = list(locations)
+                random_state.shuffle(perm)
+                current = improve(perm, deadline=deadline)
+                current_cost = gcs.get_cost_of_route(current)
+                report(current)
+                ils_stale = 0
+
+
+def _ils_worker(w, n_workers, gcs, improve, dist, candidates, random_state, seeding_deadline, deadline, results):
+    """
+    Process entry point: seeds from every `n_workers`-th start city of `_seed_starts` (starting at `w`),
+    then runs its own ILS trajectory; every route better than the worker's previous best is sent to `results`.
+    """
+    n_locs = len(gcs.locations)
+    best_route, best_cost = None, float("inf")
+
+    def _report(route):
+        nonlocal best_route, best_cost
+        c = gcs.get_cost_of_route(route)
+        if c < best_cost:
+            best_route, best_cost = list(route), c
+            results.put(best_route)
+
+    for s in _seed_starts(n_locs)[w::n_workers]:
+        if time.time() >= seeding_deadline:
+            break
+        _report(improve(_nearest_neighbor(dist, n_locs, s, candidates, seeding_deadline), deadline=deadline))
+    if best_route is None:
+        # no time to seed: start from a random route
+        _report(improve(random_state.permutation(n_locs).tolist(), deadline=deadline))
+    _iterated_local_search(gcs, improve, best_route, random_state, deadline, _report)
+
+
+def _parallel_ils(ctx, gcs, improve, dist, candidates, n_workers, seed, seeding_deadline, deadline):
+    """Runs `n_workers` ILS workers until `deadline` and returns the routes they reported."""
+    random_states = get_island_random_states(n_workers, seed)
+    args_list = [
+        (w, n_workers, gcs, improve, dist, candidates, random_states[w], seeding_deadline, deadline)
+        for w in range(n_workers)
+    ]
+    # the workers stop by themselves at the deadline; their last reports may still be in transit
+    return run_processes(ctx, _ils_worker, args_list, deadline=deadline + 0.05)
+
+
 def run_genetic_search_for_gcs(
-    gcs, timeout, random_state=np.random.RandomState(0), population_size=10
+    gcs,
+    timeout,
+    random_state=np.random.RandomState(0),
+    population_size=10,
+    lk_depth=10,
+    islands=1,
+    n_workers=1,
 ):
     """
     Tries for at most `timeout` seconds to find a good solution for the given
     GCS instance.  Three-phase strategy:
 
-      1. Seed high-quality routes via nearest-neighbour + 2-opt from every city.
-      2. Iterated Local Search: double-bridge perturbation + 2-opt (main engine).
-      3. GA bursts for diversification, refined with 2-opt.
+      1. Seed high-quality routes via nearest-neighbour + local search from every
+         city (from evenly spread ones on large instances, see `_seed_starts`).
+      2. Iterated Local Search: double-bridge perturbation + local search (main engine).
+         With `n_workers` > 1, phases 1 and 2 run in that many processes that
+         split the start cities among them and follow their own ILS
+         trajectories, reporting improvements to this process.
+      3. GA bursts for diversification, refined with local search (optionally
+         spread over several island processes).
+
+    The local search is neighbour-list 2-opt with Or-opt moves and don't-look
+    bits (see `local_search`), extended by Lin-Kernighan style variable-depth
+    moves; after a perturbation, only the ends of the new edges start out active.
 
     Args:
         gcs: Search problem instance with `locations`, `is_better_route_than`,
@@ -182,14 +406,24 @@ def run_genetic_search_for_gcs(
         random_state (np.random.RandomState): random state to control random
             behavior.
         population_size (int): number of individuals kept in each generation.
+        lk_depth (int): maximum number of exchanges in the variable-depth moves
+            of the local search (0 restricts it to 2-opt and Or-opt).
+        islands (int): number of processes for the GA burst; with more than
+            one, it runs as an island-model GA (see `island_ga`).
+        n_workers (int): number of processes for the seeding and ILS phases
+            (processes are forked; without fork, they run sequentially here).
 
     Returns:
         list: The best route found, represented as location indices.
     """
     n_locs = len(gcs.locations)
     locations = list(range(n_locs))
-    dist = _get_distance_matrix(gcs)
     start_time = time.time()
+    dist = _get_distance_matrix(gcs)
+    candidates = _get_candidates(gcs, dist)
+    improve = _get_local_search(gcs, dist, candidates, max_depth=lk_depth)
+    # plain lists iterate much faster than numpy rows in the nearest-neighbour construction
+    candidates = candidates.tolist()
 
     best_overall = None
     best_cost = float("inf")
@@ -203,58 +437,73 @@ def run_genetic_search_for_gcs(
 
     deadline = start_time + timeout - 0.5
 
-    # --- Phase 1: nearest-neighbour + 2-opt from every starting city --------
-    for s in range(n_locs):
-        if time.time() >= min(deadline, start_time + timeout * 0.2):
-            break
-        route = _nearest_neighbor(dist, n_locs, s)
-        route = _two_opt(route, dist)
-        _update_best(route)
-
-    # --- Phase 2: ILS main loop with random restarts -------------------------
-    current = list(best_overall) if best_overall else locations
-    current_cost = gcs.get_cost_of_route(current) if best_overall else float("inf")
-    ils_stale = 0
+    seeding_deadline = min(deadline, start_time + timeout * 0.2)
+    ctx = get_fork_context() if n_workers > 1 else None
+
+    if ctx is not None:
+        # --- Phases 1 and 2 in parallel: one seeding + ILS trajectory per worker
+        for route in _parallel_ils(
+            ctx, gcs, improve, dist, candidates, n_workers, random_state.randint(2**31), seeding_deadline, deadline
+        ):
+            _update_best(route)
+    else:
+        # --- Phase 1: nearest-neighbour + local search from the start cities
+        for s in _seed_starts(n_locs):
+            if time.time() >= seeding_deadline:
+                break
+            route = _nearest_neighbor(dist, n_locs, s, candidates, seeding_deadline)
+            route = improve(route, deadline=deadline)
+            _update_best(route)
 
-    while time.time() < deadline:
-        perturbed = _double_bridge(current, random_state)
-        improved = _two_opt(perturbed, dist)
-        imp_cost = gcs.get_cost_of_route(improved)
-
-        if imp_cost < current_cost:
-            current = improved
-            current_cost = imp_cost
-            _update_best(current)
-            ils_stale = 0
-        else:
-            ils_stale += 1
-            if ils_stale > 20:
-                # Random restart: fresh shuffle + 2-opt
-                perm = list(locations)
-                random_state.shuffle(perm)
-                current = _two_opt(perm, dist)
-                current_cost = gcs.get_cost_of_route(current)
-                _update_best(current)
-                ils_stale = 0
+        # --- Phase 2: ILS main loop with random restarts ---------------------
+        _iterated_local_search(gcs, improve, best_overall, random_state, deadline, _update_best)
 
     # --- Phase 3: one quick GA burst to diversify further -------------------
     if time.time() < start_time + timeout - 0.2:
-        ga = GeneticSearch(
-            init=lambda n: init(locations, random_state, n),
-            crossover=lambda p1, p2: crossover(random_state, p1, p2),
-            mutate=lambda i: mutate(random_state, i),
-            better=gcs.is_better_route_than,
-            population_size=population_size,
-        )
-        ga.reset()
-        if best_overall is not None and ga.population:
-            ga.population[0] = list(best_overall)
-        for _ in range(50):
-            if time.time() >= start_time + timeout - 0.1:
-                break
-            ga.step()
-        if ga.best is not None:
-            refined = _two_opt(ga.best, dist)
+        # whole populations as one array if the instance can evaluate them at once
+        batch = hasattr(gcs, "get_costs_of_routes")
+
+        def _make_search(rs):
+            def _seeded_init(n):
+                pop = init_batch(n_locs, rs, n) if batch else init(locations, rs, n)
+                if best_overall is not None and len(pop):
+                    pop[0] = best_overall
+                return pop
+
+            return GeneticSearch(
+                init=_seeded_init,
+                crossover=(lambda p1, p2: crossover_batch(rs, p1, p2)) if batch else (lambda p1, p2: crossover(rs, p1, p2)),
+                mutate=(lambda i: mutate_batch(rs, i)) if batch else (lambda i: mutate(rs, i)),
+                better=gcs.is_better_route_than,
+                population_size=population_size,
+                fitness=gcs.get_costs_of_routes if batch else gcs.get_cost_of_route,
+                random_state=rs,
+                batch=batch,
+            )
+
+        if islands > 1:
+            # the islands may report up to 10% of their time limit late
+            remaining = (start_time + timeout - 0.2 - time.time()) / 1.1
+            ga_best, _ = run_island_ga(
+                _make_search, remaining, num_islands=islands, seed=random_state.randint(2**31)
+            )
+        else:
+            ga = _make_search(random_state)
+            now = time.time()
+            ga.reset()
+            # until one is measured, a generation (breeding and evaluating a whole population)
+            # is assumed to take ten times as long as building and evaluating the initial one
+            step_time = 10 * (time.time() - now)
+            for _ in range(50):
+                # a generation that is not expected to finish in time (large instances) is not started
+                now = time.time()
+                if now + step_time >= start_time + timeout - 0.1:
+                    break
+                ga.step()
+                step_time = time.time() - now
+            ga_best = ga.best
+        if ga_best is not None:
+            refined = improve(np.asarray(ga_best).tolist(), deadline=start_time + timeout - 0.1)
             _update_best(refined)
 
     # Safety: guarantee we always return something
@@ -2,7 +2,7 @@ from collections import deque
 
 
 class GeneralConstructiveSearch:
-    def __init__(self, w0, succ, goal, better=None, order="dfs"):
+    def __init__(self, w0, succ, goal, better=None, order="dfs", limit=None):
         if order not in {"dfs", "bfs"}:
             raise ValueError("order must be 'dfs' or 'bfs'")
         self.w0 = w0
@@ -10,6 +10,8 @@ class GeneralConstructiveSearch:
         self.goal = goal
         self.better = better
         self.order = order
+        # without `better`: stop after `limit` solutions instead of the first one (counting mode)
+        self.limit = limit
         self.reset()
 
     def reset(self):
@@ -24,9 +26,21 @@ class GeneralConstructiveSearch:
     @property
     def active(self):
         if self.best_solution is not None and self.better is None:
-            return False
+            if self.limit is None or self.solution_count >= self.limit:
+                return False
         return len(self.OPEN) > 0
 
+    def _found(self, node):
+        """Registers a solution; returns True if the search has to stop right away."""
+        self.solution_count += 1
+        if self.better is None:
+            if self.best_solution is None:
+                self.best_solution = node
+            return self.limit is None or self.solution_count >= self.limit
+        if self.best_solution is None or self.better(node, self.best_solution):
+            self.best_solution = node
+        return False
+
     def step(self):
         if not self.active:
             return False
@@ -34,25 +48,15 @@ class GeneralConstructiveSearch:
         node = self.OPEN.popleft() if self.order == "bfs" else self.OPEN.pop()
         found_solution = False
         if self.goal(node):
-            if self.better is None:
-                self.best_solution = node
-                self.solution_count += 1
-                return True
-            if self.best_solution is None or self.better(node, self.best_solution):
-                self.best_solution = node
-            self.solution_count += 1
             found_solution = True
+            if self._found(node):
+                return True
 
         for successor in self.succ(node):
             if self.goal(successor):
-                if self.better is None:
-                    self.best_solution = successor
-                    self.solution_count += 1
-                    return True
-                if self.best_solution is None or self.better(successor, self.best_solution):
-                    self.best_solution = successor
-                self.solution_count += 1
                 found_solution = True
+                if self._found(successor):
+                    return True
             else:
                 self.OPEN.append(successor)
 
@@ -0,0 +1,132 @@
+import os
+import queue
+import time
+
+import numpy as np
+
+from processes import get_fork_context, run_processes
+
+
+def get_island_random_states(num_islands, seed=0):
+    """
+    Derives independent random states for the islands from one seed (via `np.random.SeedSequence.spawn`).
+
+    Args:
+        num_islands (int): number of random states
+        seed (int): root seed
+
+    Returns:
+        list: `num_islands` np.random.RandomState objects with statistically independent streams
+    """
+    return [np.random.RandomState(np.random.MT19937(child)) for child in np.random.SeedSequence(seed).spawn(num_islands)]
+
+
+def _drain(inbox):
+    """All migrant groups that arrived in `inbox` so far."""
+    groups = []
+    while True:
+        try:
+            groups.append(inbox.get_nowait())
+        except queue.Empty:
+            return groups
+
+
+def _run_island(i, make_search, random_state, deadline, migration_interval, num_migrants, inbox, outbox, results):
+    """Process entry point: evolves one island until the deadline and reports (island, best, best fitness, generations)."""
+    # migrants that were never picked up must not keep the process from exiting
+    inbox.cancel_join_thread()
+    outbox.cancel_join_thread()
+    search = make_search(random_state)
+    search.reset()
+    generations = 0
+    while time.time() < deadline:
+        search.step()
+        generations += 1
+        if generations % migration_interval == 0:
+            outbox.put(search.emigrants(num_migrants))
+            for group in _drain(inbox):
+                search.immigrate(group)
+    results.put((i, search.best, search.best_fitness, generations))
+
+
+def run_island_ga(make_search, timeout, num_islands=None, migration_interval=10, num_migrants=2, seed=0):
+    """
+    Evolves several GeneticSearch populations (islands) in parallel processes
+    until a shared deadline and returns the best individual found on any of them.
+
+    Every island gets its own random state derived from `seed`. Every
+    `migration_interval` generations, each island sends copies of its
+    `num_migrants` best individuals to the next island of a ring, where they
+    replace the worst individuals. Processes are started with the fork method,
+    so `make_search` (and the closures it uses) are inherited instead of
+    pickled; only migrants and results are sent between processes. Where fork
+    is not available, or with a single island, the islands are evolved
+    round-robin in the current process instead.
+
+    Args:
+        make_search (func): function that takes a np.random.RandomState and returns a (not yet reset) GeneticSearch
+        timeout (float): time limit in seconds for all islands; an island that has not reported 10% of
+            `timeout` after the deadline (because a generation ran over) is dropped
+        num_islands (int, optional): number of islands; defaults to the number of CPUs
+        migration_interval (int): number of generations between migrations
+        num_migrants (int): number of individuals sent to the next island per migration
+        seed (int): root seed of the random states of the islands
+
+    Returns:
+        (best, generations), where best is the best individual found on any island
+        and generations is the list of the numbers of generations completed per island
+    """
+    if num_islands is None:
+        num_islands = os.cpu_count() or 1
+    deadline = time.time() + timeout
+    random_states = get_island_random_states(num_islands, seed)
+    ctx = get_fork_context()
+    if ctx is None or num_islands == 1:
+        results = _evolve_round_robin(make_search, random_states, deadline, migration_interval, num_migrants)
+    else:
+        results = _archipelago(ctx, make_search, random_states, deadline, deadline + 0.1 * timeout, migration_interval, num_migrants)
+
+    # compare the islands' champions like the searches do
+    judge = make_search(np.random.RandomState(0))
+    best, best_fitness = None, None
+    for _, candidate, fitness, _ in results:
+        if candidate is None:
+            continue
+        if best is None:
+            better = True
+        elif judge.fitness is not None:
+            better = fitness < best_fitness
+        else:
+            better = judge.better(candidate, best)
+        if better:
+            best, best_fitness = candidate, fitness
+    generations = [0] * num_islands
+    for i, _, _, count in results:
+        generations[i] = count
+    return best, generations
+
+
+def _archipelago(ctx, make_search, random_states, deadline, grace, migration_interval, num_migrants):
+    num_islands = len(random_states)
+    inboxes = [ctx.Queue() for _ in range(num_islands)]
+    args_list = [
+        (i, make_search, random_states[i], deadline, migration_interval, num_migrants, inboxes[i], inboxes[(i + 1) % num_islands])
+        for i in range(num_islands)
+    ]
+    return run_processes(ctx, _run_island, args_list, deadline=grace, expected=num_islands, queues=inboxes)
+
+
+def _evolve_round_robin(make_search, random_states, deadline, migration_interval, num_migrants):
+    searches = [make_search(random_state) for random_state in random_states]
+    for search in searches:
+        search.reset()
+    generations = 0
+    while time.time() < deadline:
+        for search in searches:
+            search.step()
+        generations += 1
+        if generations % migration_interval == 0 and len(searches) > 1:
+            groups = [search.emigrants(num_migrants) for search in searches]
+            for i, search in enumerate(searches):
+                search.immigrate(groups[i - 1])
+    return [(i, search.best, search.best_fitness, generations) for i, search in enumerate(searches)]
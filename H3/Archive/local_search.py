@@ -0,0 +1,310 @@
+"""
+Neighbour-list local search for open TSP routes (paths without the closing edge).
+
+The path is closed with a dummy node that is at distance 0 from every city,
+so the moves of a closed tour apply unchanged and the dummy marks where the
+path starts and ends. The tour lives in an array with a position index,
+which makes successor/predecessor lookups and the evaluation of a move O(1).
+Only candidate neighbours (the k nearest cities) are tried as new partners,
+and don't-look bits (a queue of active cities) skip cities whose
+surroundings did not change since they last failed to improve.
+"""
+import time
+from collections import deque
+from math import hypot
+
+import numpy as np
+
+
+def candidate_lists(distances, k=10, chunk_size=1024):
+    """
+    Computes the k nearest other cities of every city from a dense distance matrix.
+
+    Args:
+        distances (np.ndarray): n x n distance matrix
+        k (int): number of candidates per city
+        chunk_size (int): number of rows processed at once
+
+    Returns:
+        np.ndarray: n x k index array, closest first
+    """
+    distances = np.asarray(distances)
+    n = distances.shape[0]
+    k = min(k, n - 1)
+    result = np.empty((n, max(k, 0)), dtype=np.intp)
+    if k <= 0:
+        return result
+    for lo in range(0, n, chunk_size):
+        hi = min(lo + chunk_size, n)
+        block = np.array(distances[lo:hi], dtype=float)
+        block[np.arange(hi - lo), np.arange(lo, hi)] = np.inf
+        nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(block, nearest, axis=1), axis=1)
+        result[lo:hi] = np.take_along_axis(nearest, order, axis=1)
+    return result
+
+
+def _distance_function(distances, coordinates, dummy):
+    """Returns dist(i, j) that is 0 for the dummy node, with the fastest lookup available."""
+    if coordinates is not None:
+        xs = [float(x) for x, _ in coordinates]
+        ys = [float(y) for _, y in coordinates]
+
+        def dist(i, j):
+            if i == dummy or j == dummy:
+                return 0.0
+            return hypot(xs[i] - xs[j], ys[i] - ys[j])
+
+        return dist
+    if isinstance(distances, np.ndarray):
+        # item() returns a Python float without creating a numpy scalar first
+        item = distances.item
+
+        def dist(i, j):
+            if i == dummy or j == dummy:
+                return 0.0
+            return item(i, j)
+
+        return dist
+
+    def dist(i, j):
+        if i == dummy or j == dummy:
+            return 0.0
+        return float(distances[i, j])
+
+    return dist
+
+
+def get_local_search(distances, candidates, or_opt=True, coordinates=None, max_depth=0, eps=1e-10):
+    """
+    Prepares a local search that improves open routes with 2-opt and Or-opt
+    moves until neither finds an improvement through the candidate lists.
+
+    2-opt replaces the edges (a, succ a) and (c, succ c) by (a, c) and
+    (succ a, succ c) (and the same with predecessors), for candidates c of a
+    that are closer to a than its current neighbour. Or-opt moves a segment
+    of 1 to 3 cities, possibly reversed, between a candidate and its neighbour.
+
+    With `max_depth` > 1, cities where neither move helps also try a
+    Lin-Kernighan style variable-depth move: a chain of up to `max_depth`
+    sequential 2-opt exchanges that keeps the first edge end fixed and
+    continues as long as the partial gain stays positive, even through
+    intermediate tours that are worse. The chain is cut back to its best
+    closed tour, or undone completely if none of them improves.
+
+    Distance lookups and candidate lists are set up once here and shared by
+    all calls.
+
+    Args:
+        distances (np.ndarray or LazyDistanceMatrix): n x n distances
+        candidates (np.ndarray): n x k candidate neighbours per city, closest first
+        or_opt (bool): whether to also try Or-opt moves
+        coordinates (array, optional): n x 2 Euclidean coordinates, used instead of `distances` for lookups if given
+        max_depth (int): maximum number of exchanges in a variable-depth move (0 or 1 disables them)
+        eps (float): minimum gain of a move
+
+    Returns:
+        function: improve(route, active=None, deadline=None) that returns the improved copy of an open route over all
+                  cities 0..n-1; `active` are the cities whose don't-look bits are initially off (default: all),
+                  and after `deadline` (as in `time.time()`) the route is returned as improved so far
+    """
+    n = len(candidates)
+    N = n  # dummy node closing the path
+    size = n + 1
+    dist = _distance_function(distances, coordinates, N)
+    # the dummy is at distance 0 from everything, so it comes first in every list
+    cand = [[N] + [int(c) for c in row] for row in np.asarray(candidates)]
+    cand.append([])
+
+    def improve(route, active=None, deadline=None):
+        if n <= 3:
+            return list(route)
+        tour = list(route) + [N]
+        pos = [0] * size
+        for i, city in enumerate(tour):
+            pos[city] = i
+        return _descend(tour, pos, active, deadline)
+
+    def _descend(tour, pos, active, deadline):
+        def succ(v):
+            return tour[(pos[v] + 1) % size]
+
+        def pred(v):
+            return tour[pos[v] - 1]
+
+        def reverse(u, v):
+            """Reverses the forward path u..v (or, equivalently, its shorter complement)."""
+            i, j = pos[u], pos[v]
+            length = (j - i) % size + 1
+            if 2 * length > size:
+                i, j = (j + 1) % size, (i - 1) % size
+                length = size - length
+            for _ in range(length // 2):
+                a, b = tour[i], tour[j]
+                tour[i], tour[j] = b, a
+                pos[b], pos[a] = i, j
+                i = i + 1 if i + 1 < size else 0
+                j = j - 1 if j > 0 else size - 1
+
+        def exchange(x1, x2, y1, y2):
+            """Replaces the tour edges (x1, x2) and (y1, y2), oriented alike, by (x1, y1) and (x2, y2)."""
+            if succ(x1) == x2:
+                reverse(x2, y1)
+            else:
+                reverse(x1, y2)
+
+        def move_segment(s1, s2, c, d, reverse_segment):
+            """Moves the forward segment s1..s2 between the adjacent cities c and d = succ(c)."""
+            segment = []
+            v = s1
+            while True:
+                segment.append(v)
+                if v == s2:
+                    break
+                v = succ(v)
+            if reverse_segment:
+                segment.reverse()
+            rest = []
+            v = succ(s2)
+            while v != s1:
+                rest.append(v)
+                v = succ(v)
+            k = rest.index(c) + 1
+            tour[:] = rest[:k] + segment + rest[k:]
+            for i, city in enumerate(tour):
+                pos[city] = i
+
+        def try_two_opt(a):
+            for forward in (True, False):
+                b = succ(a) if forward else pred(a)
+                d_ab = dist(a, b)
+                for c in cand[a]:
+                    d_ac = dist(a, c)
+                    if d_ab - d_ac <= eps:
+                        break
+                    d = succ(c) if forward else pred(c)
+                    if c == b or d == a:
+                        continue
+                    if d_ac + dist(b, d) - d_ab - dist(c, d) < -eps:
+                        if forward:
+                            reverse(b, c)
+                        else:
+                            reverse(a, d)
+                        return (a, b, c, d)
+            return None
+
+        def try_or_opt(a):
+            s1 = a
+            s2 = a
+            for _ in range(3):
+                p, nx = pred(s1), succ(s2)
+                if nx == p or nx == s1:
+                    return None
+                removal_gain = dist(p, s1) + dist(s2, nx) - dist(p, nx)
+                if removal_gain > eps:
+                    in_segment = set()
+                    v = s1
+                    while True:
+                        in_segment.add(v)
+                        if v == s2:
+                            break
+                        v = succ(v)
+                    for end in (s1, s2):
+                        for c in cand[end]:
+                            if dist(end, c) >= removal_gain - eps:
+                                break
+                            if c in in_segment:
+                                continue
+                            for x, y in ((c, succ(c)), (pred(c), c)):
+                                if x in in_segment or y in in_segment:
+                                    continue
+                                d_xy = dist(x, y)
+                                forward_cost = dist(x, s1) + dist(s2, y) - d_xy
+                                backward_cost = dist(x, s2) + dist(s1, y) - d_xy
+                                if min(forward_cost, backward_cost) < removal_gain - eps:
+                                    move_segment(s1, s2, x, y, backward_cost < forward_cost)
+                                    return (p, nx, x, y, s1, s2)
+                s2 = succ(s2)
+                if s2 == N:
+                    return None
+            return None
+
+        def try_variable_depth(t1):
+            for t2 in (succ(t1), pred(t1)):
+                g = dist(t1, t2)
+                # exchanges applied so far, the gain of the best closed tour and the chain length that reaches it
+                steps = []
+                best_gain, best_length = eps, 0
+                added = set()
+                while len(steps) < max_depth:
+                    forward = succ(t2) == t1
+                    choice = None
+                    best_g = 0.0
+                    for t3 in cand[t2]:
+                        g1 = g - dist(t2, t3)
+                        if g1 <= eps:
+                            break
+                        if t3 == t1 or t3 == succ(t2) or t3 == pred(t2):
+                            continue
+                        t4 = succ(t3) if forward else pred(t3)
+                        if t4 == t1 or t4 == t2 or (min(t3, t4), max(t3, t4)) in added:
+                            continue
+                        # greedy: the step whose removed edge gives back the most
+                        if choice is None or g1 + dist(t3, t4) > best_g:
+                            choice, best_g = (t3, t4), g1 + dist(t3, t4)
+                    if choice is None:
+                        break
+                    t3, t4 = choice
+                    exchange(t2, t1, t3, t4)
+                    steps.append((t2, t3, t4))
+                    added.add((min(t2, t3), max(t2, t3)))
+                    g = best_g
+                    gain = g - dist(t4, t1)
+                    if gain > best_gain:
+                        best_gain, best_length = gain, len(steps)
+                    t2 = t4
+                # undo the exchanges past the best closed tour
+                while len(steps) > best_length:
+                    t2, t3, t4 = steps.pop()
+                    exchange(t1, t4, t2, t3)
+                if steps:
+                    touched = [t1]
+                    for step in steps:
+                        touched.extend(step)
+                    return tuple(touched)
+            return None
+
+        queue = deque(range(n) if active is None else active)
+        queued = [False] * size
+        for v in queue:
+            queued[v] = True
+        while queue:
+            if deadline is not None and time.time() >= deadline:
+                break
+            a = queue.popleft()
+            queued[a] = False
+            touched = try_two_opt(a)
+            if touched is None and or_opt:
+                touched = try_or_opt(a)
+            if touched is None and max_depth > 1:
+                touched = try_variable_depth(a)
+            if touched is not None:
+                for v in touched + (a,):
+                    if v != N and not queued[v]:
+                        queued[v] = True
+                        queue.append(v)
+
+        i = pos[N]
+        return tour[i + 1:] + tour[:i]
+
+    return improve
+
+
+def local_search(route, distances, candidates, or_opt=True, coordinates=None, max_depth=0, active=None, deadline=None):
+    """
+    Runs the local search of `get_local_search` once on `route` (see there for the arguments).
+
+    Returns:
+        list: the improved route
+    """
+    return get_local_search(distances, candidates, or_opt=or_opt, coordinates=coordinates, max_depth=max_depth)(route, active, deadline)
@@ -0,0 +1,345 @@
+from collections import OrderedDict
+
+from general_constructive_search import GeneralConstructiveSearch
+from ac import CompiledBCN, compile_bcn, popcount
+
+
+class MACSearch(GeneralConstructiveSearch):
+    """
+    Depth-first search that Maintains Arc Consistency after every decision.
+
+    Instead of copying a state per branch, the domains live in one flat list
+    of bitsets indexed by variable id. Every modification is logged on a trail
+    as (variable, old bitset), and backtracking pops the trail back to the
+    mark of the choice point. OPEN holds the choice points as
+    [variable, untried values, trail mark] frames, and `best` is a snapshot
+    of the domains of the first solution, which the decoder of
+    `get_mac_search_for_bcn` turns into an assignment.
+
+    With `learning=True` the search also tracks why values were removed: every
+    variable carries a bitmask of the decision levels responsible for the
+    removals from its domain (kept on the trail with the domain). A wipe-out
+    yields the conflict levels, and a choice point without values left jumps
+    back to the most recent level in its conflict set instead of the previous
+    one (conflict-directed backjumping). The decisions of that conflict set
+    are stored as a nogood in a bounded LRU cache and skip the same
+    combination of decisions when it shows up again in another subtree.
+    """
+
+    def __init__(self, bcn, phi=None, learning=False, max_nogoods=10000, max_nogood_size=32):
+        compiled = bcn if isinstance(bcn, CompiledBCN) else compile_bcn(bcn)
+        self.compiled = compiled
+        self.variables = compiled.variables
+        self.index = compiled.index
+        self.values = {var: compiled.values[i] for i, var in enumerate(self.variables)}
+        self.phi = phi
+        self.learning = learning
+        self.max_nogoods = max_nogoods
+        self.max_nogood_size = max_nogood_size
+
+        # flat CSR arrays as lists: the neighbours j of i whose domains are revised when the domain of i changes
+        self.indptr = compiled.indptr.tolist()
+        self.indices = compiled.indices.tolist()
+        self.arc_table = compiled.arc_table.tolist()
+        self.tables = compiled.tables
+        self.global_indptr = compiled.global_indptr.tolist()
+        self.global_indices = compiled.global_indices.tolist()
+
+        self.dom = list(compiled.domains)
+        self.culprit = [0] * len(self.variables)
+        self.conflict = 0
+        self.trail = []
+        self.propagations = 0
+        self.root_feasible = self._propagate(range(len(self.variables)))
+        self.root = list(self.dom)
+        self.trail = []
+        self.nodes = 0
+        self.backjumps = 0
+        self.nogood_prunes = 0
+        # nogoods: frozensets of (variable, value bit) decisions in LRU order,
+        # nogood_watch indexes them by each of their literals
+        self.nogoods = OrderedDict()
+        self.nogood_watch = {}
+        super().__init__(w0=None, succ=None, goal=self._is_goal)
+
+    @property
+    def stats(self):
+        return {
+            "nodes": self.nodes,
+            "propagations": self.propagations,
+            "backjumps": self.backjumps,
+            "nogoods": len(self.nogoods),
+            "nogood_prunes": self.nogood_prunes,
+        }
+
+    # --- Trail -----------------------------------------------------------------
+
+    def _set(self, i, mask, culprit):
+        self.trail.append((i, self.dom[i], self.culprit[i]))
+        self.dom[i] = mask
+        self.culprit[i] = culprit
+
+    def _undo(self, mark):
+        trail, dom, culprit = self.trail, self.dom, self.culprit
+        while len(trail) > mark:
+            i, old, old_culprit = trail.pop()
+            dom[i] = old
+            culprit[i] = old_culprit
+
+    # --- Propagation -----------------------------------------------------------
+
+    def _propagate(self, changed):
+        """
+        AC-3 over variables: revises the neighbours of every changed variable
+        until fixpoint. Global constraints of changed variables are queued and
+        filtered once the binary arcs are consistent.
+
+        Returns:
+            bool: False on a wipe-out, in which case `self.conflict` holds the
+                  decision levels that caused it
+        """
+        dom, culprit = self.dom, self.culprit
+        indptr, indices, arc_table, tables = self.indptr, self.indices, self.arc_table, self.tables
+        global_indptr, global_indices = self.global_indptr, self.global_indices
+        queue = list(changed)
+        in_queue = set(queue)
+        gqueue = []
+        in_gqueue = set()
+        while queue or gqueue:
+            if not queue:
+                gi = gqueue.pop()
+                in_gqueue.discard(gi)
+                reduced = self._filter_global(gi)
+                if reduced is None:
+                    return False
+                for j in reduced:
+                    if j not in in_queue:
+                        queue.append(j)
+                        in_queue.add(j)
+                continue
+            i = queue.pop()
+            in_queue.discard(i)
+            D_i = dom[i]
+            for k in range(indptr[i], indptr[i + 1]):
+                j = indices[k]
+                sup = tables[arc_table[k]]
+                D_j = dom[j]
+                new_D_j = D_j
+                bits = D_j
+                while bits:
+                    low = bits & -bits
+                    bits ^= low
+                    if not sup[low.bit_length() - 1] & D_i:
+                        new_D_j ^= low
+                if new_D_j != D_j:
+                    if not new_D_j:
+                        self.conflict = culprit[i] | culprit[j]
+                        return False
+                    self._set(j, new_D_j, culprit[j] | culprit[i])
+                    self.propagations += 1
+                    if j not in in_queue:
+                        queue.append(j)
+                        in_queue.add(j)
+            for k in range(global_indptr[i], global_indptr[i + 1]):
+                gi = global_indices[k]
+                if gi not in in_gqueue:
+                    gqueue.append(gi)
+                    in_gqueue.add(gi)
+        return True
+
+    def _filter_global(self, gi):
+        ids = self.compiled.globals[gi][0]
+        # filtering a global may use the domains of all of its variables
+        reason = 0
+        for i in ids:
+            reason |= self.culprit[i]
+        reduced = self.compiled.filter_global(gi, self.dom)
+        if reduced is None:
+            self.conflict = reason
+            return None
+        for i, new in reduced:
+            self._set(i, new, reason)
+            self.propagations += 1
+        return [i for i, _ in reduced]
+
+    # --- Search ----------------------------------------------------------------
+
+    def _select_var(self):
+        """MRV (or `phi` on the decoded domains); None if every variable is fixed."""
+        dom = self.dom
+        if self.phi is not None:
+            if all(not (m & (m - 1)) for m in dom):
+                return None
+            return self.index[self.phi(self._domains())]
+        best = None
+        best_count = None
+        for i, m in enumerate(dom):
+            if m & (m - 1):
+                c = popcount(m)
+                if best_count is None or c < best_count:
+                    best, best_count = i, c
+                    if c == 2:
+                        break
+        return best
+
+    def _domains(self):
+        return {
+            var: {v for k, v in enumerate(self.values[var]) if self.dom[i] >> k & 1}
+            for i, var in enumerate(self.variables)
+        }
+
+    def _is_goal(self, node):
+        return node is not None and all(not (m & (m - 1)) for m in node)
+
+    def _push_choice(self):
+        """Opens a choice point for the next variable, or records a solution if there is none."""
+        var = self._select_var()
+        if var is None:
+            self.best_solution = tuple(self.dom)
+            self.solution_count += 1
+            return True
+        # frame: variable, untried values, trail mark, conflict levels, current value
+        self.OPEN.append([var, self.dom[var], len(self.trail), self.culprit[var], 0])
+        return False
+
+    # --- Nogoods ---------------------------------------------------------------
+
+    def _record_nogood(self, conflict):
+        """Stores the decisions of the levels in `conflict` as a nogood, unless a stored one subsumes it."""
+        OPEN = self.OPEN
+        literals = []
+        while conflict:
+            low = conflict & -conflict
+            conflict ^= low
+            frame = OPEN[low.bit_length() - 1]
+            literals.append((frame[0], frame[4]))
+        if not literals or len(literals) > self.max_nogood_size:
+            return
+        nogood = frozenset(literals)
+        nogoods, nogood_watch = self.nogoods, self.nogood_watch
+        # every stored nogood that is a subset or superset of the new one shares its literals
+        candidates = min((nogood_watch.get(lit, ()) for lit in literals), key=len)
+        for other in list(candidates):
+            if other <= nogood:
+                nogoods.move_to_end(other)
+                return
+            if nogood <= other:
+                self._forget_nogood(other)
+        nogoods[nogood] = None
+        for lit in nogood:
+            nogood_watch.setdefault(lit, set()).add(nogood)
+        if len(nogoods) > self.max_nogoods:
+            self._forget_nogood(next(iter(nogoods)))
+
+    def _forget_nogood(self, nogood):
+        del self.nogoods[nogood]
+        for lit in nogood:
+            watchers = self.nogood_watch[lit]
+            watchers.discard(nogood)
+            if not watchers:
+                del self.nogood_watch[lit]
+
+    def _violated_nogood(self, var, bit):
+        """
+        Checks whether fixing `var` to `bit` completes a stored nogood.
+
+        Returns:
+            int: the decision levels that fixed the other literals of the violated nogood, or None
+        """
+        dom, culprit = self.dom, self.culprit
+        for nogood in self.nogood_watch.get((var, bit), ()):
+            reason = 0
+            for j, b in nogood:
+                if j != var:
+                    if dom[j] != b:
+                        break
+                    reason |= culprit[j]
+            else:
+                self.nogoods.move_to_end(nogood)
+                return reason
+        return None
+
+    def reset(self):
+        self.dom = list(self.root)
+        self.trail = []
+        self.OPEN = []
+        self.best_solution = None
+        self.solution_count = 0
+        self.nodes = 0
+        self.propagations = 0
+        self.backjumps = 0
+        self.nogood_prunes = 0
+        self.culprit = [0] * len(self.variables)
+        if self.root_feasible:
+            self._push_choice()
+
+    def step(self):
+        """
+        Tries the next value of the innermost choice point, or backtracks if it has none left.
+
+        Returns:
+            bool: True iff a solution was found in this step
+        """
+        if not self.active:
+            return False
+        OPEN = self.OPEN
+        frame = OPEN[-1]
+        var, remaining, mark, conflict = frame[:4]
+        self._undo(mark)
+        if not remaining:
+            if not self.learning:
+                OPEN.pop()
+                return False
+            # all values of var failed because of the decisions in `conflict`
+            if not conflict:
+                OPEN.clear()
+                return False
+            self._record_nogood(conflict)
+            level = conflict.bit_length() - 1
+            self.backjumps += len(OPEN) - 2 - level
+            del OPEN[level + 1:]
+            OPEN[level][3] |= conflict ^ (1 << level)
+            return False
+        bit = remaining & -remaining
+        frame[1] = remaining ^ bit
+        frame[4] = bit
+        level_bit = 1 << (len(OPEN) - 1)
+        if self.learning and self.nogoods:
+            reason = self._violated_nogood(var, bit)
+            if reason is not None:
+                self.nogood_prunes += 1
+                frame[3] |= reason & ~level_bit
+                return False
+        self.nodes += 1
+        self._set(var, bit, level_bit)
+        if not self._propagate([var]):
+            frame[3] |= self.conflict & ~level_bit
+            return False
+        return self._push_choice()
+
+
+def get_mac_search_for_bcn(bcn, phi=None, learning=False, max_nogoods=10000):
+    """
+        Generates a MAC search (trail-based, no state copies) that can find a solution in the search space described by the BCN.
+
+    Args:
+        bcn ((domains, constraints) or CompiledBCN): The BCN in which we look for a solution, possibly compiled by `ac.compile_bcn`.
+            Binary constraints may be arbitrary; global constraints need a `filter` method like `AllDifferent`.
+        phi (func, optional): Function that takes a dictionary of domains (variables are keys) and selects the variable to fix next.
+        learning (bool): Whether to backjump to the culprit decision on failures and learn nogoods.
+        max_nogoods (int): Maximum number of nogoods kept (least recently used ones are dropped first).
+
+    Returns:
+        (search, decoder), where
+         - search is a GeneralConstructiveSearch object
+         - decoder is a function to decode a node to an assignment
+    """
+    search = MACSearch(bcn, phi=phi, learning=learning, max_nogoods=max_nogoods)
+
+    def decoder(node):
+        return {
+            var: search.values[var][node[i].bit_length() - 1]
+            for i, var in enumerate(search.variables)
+        }
+
+    return search, decoder
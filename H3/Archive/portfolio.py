@@ -0,0 +1,97 @@
+import time
+from functools import partial
+
+import numpy as np
+
+from ac import get_general_constructive_search_for_bcn
+from mac import get_mac_search_for_bcn
+from processes import get_fork_context, run_processes
+
+
+def _bitmask_solver(bcn, seed=None, **kwargs):
+    # a fresh random state per call, so repeated solves do not share (and advance) one stream
+    if seed is not None:
+        kwargs["random_state"] = np.random.RandomState(seed)
+    return get_general_constructive_search_for_bcn(bcn, **kwargs)
+
+
+def _mac_solver(bcn, **kwargs):
+    return get_mac_search_for_bcn(bcn, **kwargs)
+
+
+# name -> function that takes a BCN and returns (search, decoder)
+DEFAULT_PORTFOLIO = {
+    "mrv": _bitmask_solver,
+    "domwdeg_luby": partial(_bitmask_solver, heuristic="dom/wdeg", restarts="luby"),
+    "mrv_geometric": partial(_bitmask_solver, restarts="geometric", seed=1),
+    "mac_learning": partial(_mac_solver, learning=True),
+}
+
+
+def _run_solver(name, solver, bcn, results):
+    """Process entry point: runs one configuration to completion and reports (name, assignment or None)."""
+    search, decoder = solver(bcn)
+    while search.active:
+        search.step()
+    results.put((name, decoder(search.best) if search.best is not None else None))
+
+
+def _log_winner(log_path, winner, elapsed, solved, num_solvers):
+    with open(log_path, "a") as f:
+        f.write(f"{time.strftime('%Y-%m-%dT%H:%M:%S')}\t{winner}\t{elapsed:.4f}\t{'solved' if solved else 'infeasible'}\t{num_solvers}\n")
+
+
+def solve_with_portfolio(bcn, portfolio=None, timeout=None, log_path=None):
+    """
+    Runs several solver configurations on the same BCN in parallel processes
+    and returns the answer of the first one that finishes; the others are terminated.
+
+    Each configuration runs its search to the end, so a configuration that
+    exhausts its search space without a solution proves that there is none
+    and also ends the race. Processes are started with the fork method, so
+    the BCN (whose constraints usually are lambdas) is inherited instead of
+    pickled. Where fork is not available, the searches are interleaved step
+    by step in the current process instead.
+
+    Args:
+        bcn ((domains, constraints)): The BCN in which we look for a solution.
+        portfolio (dict, optional): configuration name -> function that takes the BCN and returns (search, decoder). Defaults to `DEFAULT_PORTFOLIO`.
+        timeout (float, optional): time limit in seconds; None waits for the first answer
+        log_path (str, optional): file to which a tab-separated line (time, winner, seconds, solved/infeasible, number of configurations) is appended
+
+    Returns:
+        (assignment, winner), where assignment is the solution (None if there is none or the time ran out)
+        and winner is the name of the configuration that answered (None on timeout)
+    """
+    if portfolio is None:
+        portfolio = DEFAULT_PORTFOLIO
+    t_start = time.time()
+    ctx = get_fork_context()
+    if ctx is None:
+        assignment, winner = _interleave(bcn, portfolio, timeout)
+    else:
+        assignment, winner = _race(ctx, bcn, portfolio, timeout)
+    if log_path is not None and winner is not None:
+        _log_winner(log_path, winner, time.time() - t_start, assignment is not None, len(portfolio))
+    return assignment, winner
+
+
+def _race(ctx, bcn, portfolio, timeout):
+    deadline = None if timeout is None else time.time() + timeout
+    answers = run_processes(ctx, _run_solver, [(name, solver, bcn) for name, solver in portfolio.items()], deadline=deadline, expected=1)
+    if not answers:
+        # time ran out, or every process died without answering (e.g. an exception in a solver)
+        return None, None
+    winner, assignment = answers[0]
+    return assignment, winner
+
+
+def _interleave(bcn, portfolio, timeout):
+    runs = [(name, *solver(bcn)) for name, solver in portfolio.items()]
+    deadline = None if timeout is None else time.time() + timeout
+    while deadline is None or time.time() < deadline:
+        for name, search, decoder in runs:
+            search.step()
+            if not search.active:
+                return (decoder(search.best) if search.best is not None else None), name
+    return None, None
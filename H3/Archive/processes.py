@@ -0,0 +1,66 @@
+import multiprocessing as mp
+import queue
+import time
+
+
+def get_fork_context():
+    """
+    Returns the multiprocessing context that starts processes with fork, or None where fork is not available.
+
+    With fork, the processes inherit their arguments (including lambdas and
+    closures) instead of receiving pickled copies.
+    """
+    try:
+        return mp.get_context("fork")
+    except ValueError:
+        return None
+
+
+def run_processes(ctx, target, args_list, deadline=None, expected=None, queues=()):
+    """
+    Runs `target(*args, results)` in one daemon process per entry of `args_list`
+    and collects what the processes put into the shared `results` queue.
+
+    Collecting stops once `expected` results have arrived, once `deadline` has
+    passed, or once every process has ended and the queue is empty (e.g. after
+    an exception in a process). Then the processes that are still running are
+    terminated, all of them are joined, and the results queue and `queues` are closed.
+
+    Args:
+        ctx (multiprocessing context): context that creates the processes and the results queue
+        target (func): process entry point; its last argument is the results queue
+        args_list (list): one tuple of arguments per process
+        deadline (float, optional): time (as in `time.time()`) after which no more results are awaited; None waits without limit
+        expected (int, optional): number of results after which collecting stops; None collects until the deadline
+        queues (iterable): further queues of the processes (e.g. for messages between them) to close at the end
+
+    Returns:
+        list: the collected results in the order of their arrival
+    """
+    results = ctx.Queue()
+    processes = [ctx.Process(target=target, args=(*args, results), daemon=True) for args in args_list]
+    for p in processes:
+        p.start()
+    collected = []
+    try:
+        while expected is None or len(collected) < expected:
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.time())
+            if wait <= 0:
+                break
+            # checked before waiting, so results sent right before a process ended are still collected
+            finished = not any(p.is_alive() for p in processes)
+            try:
+                collected.append(results.get(timeout=wait))
+            except queue.Empty:
+                if finished:
+                    break
+    finally:
+        for p in processes:
+            if p.is_alive():
+                p.terminate()
+        for p in processes:
+            p.join()
+        for q in [*queues, results]:
+            q.close()
+            q.cancel_join_thread()
+    return collected
@@ -1,13 +1,14 @@
 import numpy as np
-from ac import get_binarized_constraints_for_all_diff
+from ac import get_binarized_constraints_for_all_diff, get_global_constraint_for_all_diff
 
 
-def get_bcn_for_sudoku(sudoku):
+def get_bcn_for_sudoku(sudoku, binarized=False):
     """
-        Receives a Sudoku and creates a BCN definition from it, using the binarized All-Diff Constraint
+        Receives a Sudoku and creates a BCN definition from it, using one global All-Diff Constraint per row, column and block
 
     Args:
         sudoku (np.ndarray): numpy array describing the sudoku
+        binarized (bool): if True, emit the pairwise binarized All-Diff Constraints instead
 
     Returns:
         (domains, constraints): BCN describing the conditions for the given Sudoku
@@ -27,19 +28,20 @@ def get_bcn_for_sudoku(sudoku):
                 domains[(i, j)] = set(all_values)
 
     # Build all-diff constraints for rows, columns, and blocks
+    all_diff = get_binarized_constraints_for_all_diff if binarized else get_global_constraint_for_all_diff
     constraints = {}
     for r in range(n):
         row_doms = {(r, c): domains[(r, c)] for c in range(n)}
-        constraints.update(get_binarized_constraints_for_all_diff(row_doms))
+        constraints.update(all_diff(row_doms))
     for c in range(n):
         col_doms = {(r, c): domains[(r, c)] for r in range(n)}
-        constraints.update(get_binarized_constraints_for_all_diff(col_doms))
+        constraints.update(all_diff(col_doms))
     for bi in range(block_size):
         for bj in range(block_size):
             blk_doms = {}
             for r in range(bi * block_size, (bi + 1) * block_size):
                 for c in range(bj * block_size, (bj + 1) * block_size):
                     blk_doms[(r, c)] = domains[(r, c)]
-            constraints.update(get_binarized_constraints_for_all_diff(blk_doms))
+            constraints.update(all_diff(blk_doms))
 
     return domains, constraints
@@ -0,0 +1,228 @@
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ac import get_general_constructive_search_for_bcn
+from sudoku import get_bcn_for_sudoku
+
+
+def read_puzzles(path):
+    """
+    Lazily yields puzzles from a text file with one puzzle per line.
+
+    Each line holds the n*n cells of a puzzle in row-major order, with '0'
+    or '.' for empty cells. A 9x9 sudoku may be written as 81 characters
+    with one digit per cell; larger grids separate their cells with commas
+    or whitespace (e.g. "0,15,0,...,12" for 16x16). Blank lines and lines
+    starting with '#' are skipped.
+
+    Args:
+        path (str): path of the puzzle file
+
+    Yields:
+        str: the normalized puzzle line (empty cells as '0')
+    """
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            yield line.replace(".", "0")
+
+
+def _is_delimited(line):
+    return "," in line or any(ch.isspace() for ch in line)
+
+
+def parse_puzzle(line):
+    """
+    Converts a puzzle line into the numpy array expected by `get_bcn_for_sudoku`.
+
+    Args:
+        line (str): puzzle line as yielded by `read_puzzles`
+
+    Returns:
+        np.ndarray: n x n integer array with 0 for empty cells
+
+    Raises:
+        ValueError: if the line does not describe a square grid of valid cells; lines
+                    without delimiters must have exactly 81 cells, one digit each
+    """
+    if _is_delimited(line):
+        cells = line.replace(",", " ").split()
+    elif len(line) == 81:
+        cells = list(line)
+    else:
+        raise ValueError(
+            f"puzzle line of length {len(line)} without delimiters; only 9x9 puzzles may use one "
+            "character per cell, larger grids must separate their cells with commas or whitespace"
+        )
+    n = int(round(len(cells) ** 0.5))
+    if n * n != len(cells) or int(round(n ** 0.5)) ** 2 != n:
+        raise ValueError(f"puzzle line with {len(cells)} cells is not a sudoku grid")
+    try:
+        values = [int(cell) for cell in cells]
+    except ValueError:
+        raise ValueError(f"puzzle line contains a cell that is not a number: {line!r}") from None
+    if not all(0 <= v <= n for v in values):
+        raise ValueError(f"puzzle line contains values outside of 0..{n}")
+    return np.array(values, dtype=int).reshape(n, n)
+
+
+def solve_puzzle(line):
+    """
+    Solves a single puzzle line with the bitmask BCN solver from `ac.py`.
+
+    Args:
+        line (str): puzzle line as yielded by `read_puzzles`
+
+    Returns:
+        str: the solved grid as a line of digits (comma-separated numbers for grids larger
+             than 9x9), or '' if there is no solution
+    """
+    sudoku = parse_puzzle(line)
+    search, decoder = get_general_constructive_search_for_bcn(get_bcn_for_sudoku(sudoku))
+    while search.active:
+        search.step()
+    if search.best is None:
+        return ""
+    solution = decoder(search.best)
+    n = sudoku.shape[0]
+    return ("" if n <= 9 else ",").join(str(solution[(r, c)]) for r in range(n) for c in range(n))
+
+
+def _solve_chunk(lines):
+    """
+    Worker entry point: solves a chunk and times every puzzle individually.
+    Malformed lines get the solution None instead of aborting the chunk.
+    """
+    results = []
+    for line in lines:
+        t0 = time.perf_counter()
+        try:
+            solution = solve_puzzle(line)
+        except ValueError:
+            solution = None
+        results.append((solution, time.perf_counter() - t0))
+    return results
+
+
+def _chunks(iterable, chunk_size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def solve_puzzle_file(
+    in_path,
+    out_path,
+    workers=None,
+    chunk_size=64,
+    max_pending=None,
+    reservoir_size=10000,
+    random_state=None,
+):
+    """
+    Solves all puzzles of `in_path` on a process pool and writes one solution
+    line per puzzle to `out_path`, in input order.
+
+    Puzzles are read lazily and dispatched in chunks. At most `max_pending`
+    chunks are in flight at any time and latencies are kept in a fixed-size
+    reservoir sample, so memory stays flat regardless of the file size.
+    Unsolvable puzzles and malformed lines (see `parse_puzzle`) are written
+    as empty lines to keep lines aligned; malformed lines are counted as rejected.
+
+    Args:
+        in_path (str): file with one puzzle per line (see `read_puzzles`)
+        out_path (str): file the solutions are written to
+        workers (int, optional): number of worker processes (defaults to the number of CPUs)
+        chunk_size (int): number of puzzles sent to a worker at once
+        max_pending (int, optional): maximum number of chunks in flight (defaults to 4 per worker)
+        reservoir_size (int): number of latency samples kept for the percentiles
+        random_state (np.random.RandomState, optional): random state used for reservoir sampling
+            (defaults to `np.random.RandomState(0)`)
+
+    Returns:
+        dict: statistics with the number of puzzles, solved puzzles, rejected lines,
+              elapsed seconds, puzzles per second and latency percentiles (seconds)
+              of the puzzles that were not rejected
+    """
+    if random_state is None:
+        random_state = np.random.RandomState(0)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = 4 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        reservoir = []
+        num_puzzles = 0
+        num_solved = 0
+        num_rejected = 0
+        t_start = time.perf_counter()
+
+        with open(out_path, "w") as out:
+
+            def _drain_one():
+                nonlocal num_puzzles, num_solved, num_rejected
+                for solution, latency in pending.popleft().result():
+                    num_puzzles += 1
+                    if solution is None:
+                        out.write("\n")
+                        num_rejected += 1
+                        continue
+                    out.write(solution + "\n")
+                    if solution:
+                        num_solved += 1
+                    # reservoir sampling over the latencies of the accepted puzzles
+                    seen = num_puzzles - num_rejected
+                    if len(reservoir) < reservoir_size:
+                        reservoir.append(latency)
+                    else:
+                        k = random_state.randint(0, seen)
+                        if k < reservoir_size:
+                            reservoir[k] = latency
+
+            for chunk in _chunks(read_puzzles(in_path), chunk_size):
+                if len(pending) >= max_pending:
+                    _drain_one()
+                pending.append(pool.submit(_solve_chunk, chunk))
+            while pending:
+                _drain_one()
+
+        elapsed = time.perf_counter() - t_start
+
+    stats = {
+        "puzzles": num_puzzles,
+        "solved": num_solved,
+        "rejected": num_rejected,
+        "elapsed": elapsed,
+        "puzzles_per_sec": num_puzzles / elapsed if elapsed > 0 else float("inf"),
+    }
+    for q in (50, 90, 99):
+        stats[f"latency_p{q}"] = float(np.percentile(reservoir, q)) if reservoir else float("nan")
+    return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python sudoku_batch.py <puzzles.txt> <solutions.txt> [workers]")
+        sys.exit(1)
+    stats = solve_puzzle_file(
+        sys.argv[1], sys.argv[2], workers=int(sys.argv[3]) if len(sys.argv) > 3 else None
+    )
+    print(f"{stats['puzzles']} puzzles ({stats['solved']} solved, {stats['rejected']} rejected) in {stats['elapsed']:.2f}s")
+    print(f"  {stats['puzzles_per_sec']:.1f} puzzles/s")
+    print(
+        f"  latency p50={stats['latency_p50'] * 1000:.2f}ms "
+        f"p90={stats['latency_p90'] * 1000:.2f}ms p99={stats['latency_p99'] * 1000:.2f}ms"
+    )
@@ -0,0 +1,113 @@
+import time
+
+import numpy as np
+
+from ac import get_general_constructive_search_for_bcn
+from mac import get_mac_search_for_bcn
+from sudoku import get_bcn_for_sudoku
+
+
+def generate_sudoku(block_size, holes, random_state):
+    """
+    Creates a solvable sudoku by shuffling a canonical solved grid (values,
+    rows within bands, bands, columns within stacks, stacks) and emptying a
+    fraction of the cells.
+
+    Args:
+        block_size (int): size k of the blocks; the grid has n = k*k rows
+        holes (float): fraction of cells that are emptied
+        random_state (np.random.RandomState): random state to control random behavior
+
+    Returns:
+        (puzzle, solution): two n x n numpy arrays, with 0 for empty cells in the puzzle
+    """
+    k = block_size
+    n = k * k
+    grid = np.array([[(k * (r % k) + r // k + c) % n + 1 for c in range(n)] for r in range(n)])
+    grid = (random_state.permutation(n) + 1)[grid - 1]
+    rows = np.concatenate([b * k + random_state.permutation(k) for b in random_state.permutation(k)])
+    cols = np.concatenate([b * k + random_state.permutation(k) for b in random_state.permutation(k)])
+    solution = grid[rows][:, cols]
+    puzzle = solution.copy()
+    puzzle.ravel()[random_state.choice(n * n, int(holes * n * n), replace=False)] = 0
+    return puzzle, solution
+
+
+def _is_valid_solution(puzzle, assignment):
+    n = puzzle.shape[0]
+    k = int(round(n ** 0.5))
+    grid = np.zeros((n, n), dtype=int)
+    for (r, c), v in assignment.items():
+        grid[r, c] = v
+    if not (grid[puzzle > 0] == puzzle[puzzle > 0]).all():
+        return False
+    full = set(range(1, n + 1))
+    for i in range(n):
+        if set(grid[i, :]) != full or set(grid[:, i]) != full:
+            return False
+        block = grid[(i // k) * k:(i // k + 1) * k, (i % k) * k:(i % k + 1) * k]
+        if set(block.ravel()) != full:
+            return False
+    return True
+
+
+SOLVERS = {
+    "bitmask": lambda bcn: get_general_constructive_search_for_bcn(bcn),
+    "domwdeg_luby": lambda bcn: get_general_constructive_search_for_bcn(bcn, heuristic="dom/wdeg", restarts="luby"),
+    "mac": lambda bcn: get_mac_search_for_bcn(bcn),
+}
+
+
+def benchmark_sudoku_solvers(
+    sizes=((3, 0.6), (4, 0.6), (5, 0.5)),
+    num_instances=3,
+    solvers=("bitmask", "domwdeg_luby", "mac"),
+    max_time_per_instance=60,
+    binarized=False,
+):
+    """
+    Solves generated 9x9, 16x16 and 25x25 instances with every solver and
+    prints solve time, nodes and propagations per instance.
+
+    Args:
+        sizes: pairs (block size, fraction of empty cells)
+        num_instances (int): number of instances per size (seeds 0, 1, ...)
+        solvers: names of the solvers in `SOLVERS` to run
+        max_time_per_instance (float): time limit in seconds per solver and instance (might be exceeded by one step)
+        binarized (bool): whether to use the binarized All-Diff encoding
+
+    Returns:
+        list: one dict per (solver, instance) with size, seed, solver, solved, time, nodes and propagations
+    """
+    results = []
+    for block_size, holes in sizes:
+        n = block_size * block_size
+        for seed in range(num_instances):
+            puzzle, _ = generate_sudoku(block_size, holes, np.random.RandomState(seed))
+            for name in solvers:
+                t_start = time.time()
+                search, decoder = SOLVERS[name](get_bcn_for_sudoku(puzzle, binarized=binarized))
+                while search.active and time.time() - t_start < max_time_per_instance:
+                    search.step()
+                elapsed = time.time() - t_start
+                solved = search.best is not None and _is_valid_solution(puzzle, decoder(search.best))
+                stats = search.stats
+                row = {
+                    "size": f"{n}x{n}",
+                    "seed": seed,
+                    "solver": name,
+                    "solved": solved,
+                    "time": elapsed,
+                    "nodes": stats["nodes"],
+                    "propagations": stats["propagations"],
+                }
+                results.append(row)
+                print(
+                    f"{row['size']:>7} seed {seed}  {name:<8} solved={solved!s:<5} "
+                    f"time={elapsed:8.3f}s  nodes={row['nodes']}  propagations={row['propagations']}"
+                )
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_sudoku_solvers()
@@ -0,0 +1,389 @@
+import itertools
+import numpy as np
+import time
+from sudoku import get_bcn_for_sudoku
+from ac import ac3, ac3_bitset, compile_supports, AllDifferent, get_general_constructive_search_for_bcn, luby, count_solutions_for_bcn
+from ac import compile_bcn, ac3_compiled, ac2001
+
+board_9 = np.array([
+    [5,3,0,0,7,0,0,0,0],[6,0,0,1,9,5,0,0,0],[0,9,8,0,0,0,0,6,0],
+    [8,0,0,0,6,0,0,0,3],[4,0,0,8,0,3,0,0,1],[7,0,0,0,2,0,0,0,6],
+    [0,6,0,0,0,0,2,8,0],[0,0,0,4,1,9,0,0,5],[0,0,0,0,8,0,0,7,9],
+])
+
+
+def random_bcn(seed, n_vars=40, domain_size=30, n_constraints=120):
+    """Random BCN over integer domains with non all-different constraints."""
+    rs = np.random.RandomState(seed)
+    domains = {i: set(rs.choice(100, domain_size, replace=False).tolist()) for i in range(n_vars)}
+    constraints = {}
+    for _ in range(n_constraints):
+        a, b = sorted(rs.choice(n_vars, 2, replace=False).tolist())
+        k = int(rs.randint(20, 120))
+        constraints[(a, b)] = lambda x, y, k=k: x + y > k and (x - y) % 7 != 0
+    return domains, constraints
+
+
+# ---- Bitset AC-3 agrees with AC-3 ----
+print("=== ac3_bitset ===")
+for seed in range(5):
+    bcn = random_bcn(seed)
+    (d1, _), f1 = ac3(bcn)
+    compiled = compile_supports(bcn)
+    t0 = time.time()
+    (d2, _), f2 = ac3_bitset(bcn, compiled)
+    assert f1 == f2, f"seed {seed}: feasibility differs"
+    assert not f1 or d1 == d2, f"seed {seed}: domains differ"
+    print(f"  seed {seed}: feasible={f1}  {time.time() - t0:.4f}s")
+
+(d1, _), _ = ac3(get_bcn_for_sudoku(board_9))
+(d2, _), _ = ac3_bitset(get_bcn_for_sudoku(board_9))
+assert d1 == d2
+print("ac3_bitset: OK")
+
+# ---- Global all-different filtering removes exactly the unsupported values ----
+print("\n=== AllDifferent ===")
+rs = np.random.RandomState(0)
+for _ in range(500):
+    n = rs.randint(1, 6)
+    domains = {i: set(rs.choice(6, rs.randint(1, 5), replace=False).tolist()) for i in range(n)}
+    constraint = AllDifferent(tuple(range(n)))
+    solutions = [p for p in itertools.product(*[sorted(domains[i]) for i in range(n)]) if constraint(*p)]
+    reduced = constraint.filter(domains)
+    if not solutions:
+        assert reduced is None, f"{domains}: infeasibility not detected"
+        continue
+    for i in range(n):
+        assert reduced.get(i, domains[i]) == {p[i] for p in solutions}, f"{domains}: wrong domain for {i}"
+
+# Exercise 3: pigeonhole that pairwise arc consistency cannot detect
+pigeonhole = ({1: {0, 1}, 2: {0, 1}, 3: {0, 1}}, {(1, 2, 3): AllDifferent((1, 2, 3))})
+assert not ac3(pigeonhole)[1]
+assert not ac3_bitset(pigeonhole)[1]
+
+(d1, _), _ = ac3(get_bcn_for_sudoku(board_9))
+(d2, _), _ = ac3(get_bcn_for_sudoku(board_9, binarized=True))
+assert all(d1[var] <= d2[var] for var in d1)
+
+# filter_bits agrees with filter on the same domains as bitsets
+for _ in range(300):
+    n = rs.randint(1, 7)
+    domains = {i: set(rs.choice(7, rs.randint(1, 6), replace=False).tolist()) for i in range(n)}
+    constraint = AllDifferent(tuple(range(n)))
+    reduced = constraint.filter(domains)
+    bits = constraint.filter_bits([sum(1 << v for v in domains[i]) for i in range(n)])
+    if reduced is None:
+        assert bits is None
+        continue
+    assert bits == [sum(1 << v for v in reduced.get(i, domains[i])) for i in range(n)]
+
+# large scope: x_i in {i, i+1} and x_last in {0}; the last variable needs an
+# augmenting path through all others, after which every domain is fixed to i+1
+t0 = time.time()
+n = 5000
+wide = ({i: {i, i + 1} for i in range(n - 1)}, {})
+wide[0][n - 1] = {0}
+wide[1][tuple(range(n))] = AllDifferent(tuple(range(n)))
+expected = {i: {i + 1} for i in range(n - 1)}
+expected[n - 1] = {0}
+reduced = wide[1][tuple(range(n))].filter(wide[0])
+assert all(reduced.get(i, wide[0][i]) == expected[i] for i in range(n))
+compiled_wide = compile_bcn(wide)
+dom, feasible = ac3_compiled(compiled_wide)
+assert feasible and compiled_wide.to_sets(dom) == expected
+print(f"  AllDifferent over {n} variables (sets, compiled): {time.time() - t0:.2f}s")
+print("AllDifferent: OK")
+
+
+# ---- AC-2001 agrees with AC-3 and checks fewer pairs ----
+print("\n=== ac2001 ===")
+for seed in range(5):
+    bcn = random_bcn(seed)
+    (d1, _), f1 = ac3(bcn)
+    (d2, _), f2 = ac2001(bcn)
+    assert f1 == f2 and (not f1 or d1 == d2), seed
+(d1, _), _ = ac3(get_bcn_for_sudoku(board_9))
+(d2, _), _ = ac2001(get_bcn_for_sudoku(board_9))
+assert d1 == d2
+assert not ac2001(pigeonhole)[1]
+
+# precedence chain with large domains: bounds move step by step, so arcs are revised many times
+checks = [0]
+
+
+def before(x, y, d=3):
+    checks[0] += 1
+    return x + d <= y
+
+
+domains = {i: set(range(200)) for i in range(20)}
+chain = {(i, i + 1): before for i in range(19)}
+counts = []
+for algorithm in [ac3, ac2001]:
+    checks[0] = 0
+    (d, _), feasible = algorithm((domains, chain))
+    assert feasible and min(d[19]) == 57 and max(d[0]) == 142
+    counts.append(checks[0])
+print(f"  constraint checks: ac3={counts[0]}  ac2001={counts[1]}")
+assert counts[1] < counts[0]
+print("ac2001: OK")
+
+
+# ---- Compiled CSR BCN ----
+print("\n=== Compiled BCN ===")
+for seed in range(6):
+    domains, constraints = random_bcn(seed)
+    if seed % 2:
+        constraints[(3, 8, 13, 21)] = AllDifferent((3, 8, 13, 21))
+    (d1, _), f1 = ac3((domains, constraints))
+    compiled = compile_bcn((domains, constraints))
+    d2, f2 = ac3_compiled(compiled)
+    assert f1 == f2 and (not f1 or d1 == compiled.to_sets(d2)), seed
+for binarized in [False, True]:
+    (d1, _), _ = ac3(get_bcn_for_sudoku(board_9, binarized=binarized))
+    compiled = compile_bcn(get_bcn_for_sudoku(board_9, binarized=binarized))
+    d2, feasible = ac3_compiled(compiled)
+    assert feasible and d1 == compiled.to_sets(d2)
+    assert len(compiled.tables) <= 2 * 27  # one shared != per group and direction
+assert not ac3_compiled(compile_bcn(pigeonhole))[1]
+
+# 10^5 variables on a path, x_i and x_(i+1) one apart, x_0 = 0: values alternate in parity
+n = 10 ** 5
+one_apart = lambda x, y: abs(x - y) == 1
+domains = {i: set(range(10)) for i in range(n)}
+domains[0] = {0}
+t0 = time.time()
+compiled = compile_bcn((domains, {(i, i + 1): one_apart for i in range(n - 1)}))
+dom, feasible = ac3_compiled(compiled)
+assert feasible and len(compiled.tables) == 2 and compiled.indices.shape == (2 * (n - 1),)
+assert compiled.to_sets(dom)[3] == {1, 3} and compiled.to_sets(dom)[n - 1] == {1, 3, 5, 7, 9}
+print(f"  10^5 variables: compiled and propagated in {time.time() - t0:.2f}s")
+print("Compiled BCN: OK")
+
+
+def solve(bcn, **kwargs):
+    search, decoder = get_general_constructive_search_for_bcn(bcn, **kwargs)
+    while search.active:
+        search.step()
+    return decoder(search.best) if search.best is not None else None
+
+
+# ---- Declared all-different groups ----
+print("\n=== Declared groups ===")
+# 5x5 Latin square with both diagonals all-different (no perfect-square blocks)
+n = 5
+domains = {(r, c): set(range(1, n + 1)) for r in range(n) for c in range(n)}
+domains[(0, 0)] = {1}
+groups = [[(r, c) for c in range(n)] for r in range(n)] + [[(r, c) for r in range(n)] for c in range(n)]
+groups += [[(i, i) for i in range(n)], [(i, n - 1 - i) for i in range(n)]]
+sol = solve((domains, {}), groups=groups)
+assert sol is not None and sol[(0, 0)] == 1
+for group in groups:
+    assert len({sol[var] for var in group}) == n
+print("Latin square with diagonals: OK")
+
+# Timetabling: 4 courses, 6 slots, two overlapping student groups (not tight, no hidden singles)
+domains = {"math": {1, 2}, "physics": {1, 2}, "chemistry": {1, 2, 3, 4, 5, 6}, "biology": {2, 3}}
+groups = [("math", "physics", "chemistry"), ("chemistry", "biology")]
+sol = solve((domains, {}), groups=groups)
+assert sol is not None and sol["chemistry"] not in (1, 2, sol["biology"])
+assert solve(({"a": {1, 2}, "b": {1, 2}, "c": {1, 2}}, {}), groups=[("a", "b", "c")]) is None
+print("Timetabling: OK")
+
+
+# ---- dom/wdeg, restarts and bitmask phi ----
+print("\n=== Variable ordering and restarts ===")
+assert [luby(i) for i in range(1, 16)] == [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8]
+n = 7
+domains = {(r, c): set(range(1, n + 1)) for r in range(n) for c in range(n)}
+groups = [[(r, c) for c in range(n)] for r in range(n)] + [[(r, c) for r in range(n)] for c in range(n)]
+groups += [[(i, i) for i in range(n)], [(i, n - 1 - i) for i in range(n)]]
+
+
+def largest_mask(state):
+    """Bitmask phi: the unfixed variable with the largest domain bitmask (a poor choice, so that the search fails often)."""
+    return max((var for var, m in state.items() if m & (m - 1)), key=lambda var: state[var], default=None)
+
+
+configs = [
+    dict(heuristic="dom/wdeg"),
+    dict(random_state=np.random.RandomState(1)),
+    dict(heuristic="dom/wdeg", restarts="luby", restart_base=2),
+    dict(phi_mask=largest_mask),
+    dict(phi_mask=largest_mask, restarts="luby", restart_base=1),
+    dict(phi_mask=largest_mask, restarts="geometric", restart_base=1, restart_factor=1.2),
+]
+for kwargs in configs:
+    search, decoder = get_general_constructive_search_for_bcn((domains, {}), groups=groups, **kwargs)
+    while search.active:
+        search.step()
+    sol = decoder(search.best)
+    for group in groups:
+        assert len({sol[var] for var in group}) == n, kwargs
+    if kwargs.get("restart_base") == 1:
+        assert search.stats["restarts"] > 0
+    print(f"  {sorted(kwargs)}: {search.stats}")
+# restarts keep the search complete
+assert solve(({"a": {1, 2}, "b": {1, 2}, "c": {1, 2}}, {}), groups=[("a", "b", "c")], restarts="luby", restart_base=1) is None
+print("Variable ordering and restarts: OK")
+
+
+# ---- Solution counting with a limit ----
+print("\n=== Solution counting ===")
+n = 4
+domains = {(r, c): set(range(1, n + 1)) for r in range(n) for c in range(n)}
+groups = [[(r, c) for c in range(n)] for r in range(n)] + [[(r, c) for r in range(n)] for c in range(n)]
+for use_cache in [False, True]:
+    assert count_solutions_for_bcn((domains, {}), limit=1000, use_cache=use_cache, groups=groups) == 576  # 4x4 Latin squares
+    assert count_solutions_for_bcn((domains, {}), limit=2, use_cache=use_cache, groups=groups) == 2
+    assert count_solutions_for_bcn(get_bcn_for_sudoku(board_9), use_cache=use_cache) == 1
+    assert count_solutions_for_bcn(pigeonhole, use_cache=use_cache) == 0
+# mixed relations (not only !=) agree with brute force
+mixed_relations = [lambda a, b: a == b, lambda a, b: a != b, lambda a, b: a < b, lambda a, b: abs(a - b) == 1]
+rs = np.random.RandomState(3)
+for trial in range(100):
+    variables = list(range(rs.randint(2, 6)))
+    mixed_domains = {v: set(rs.choice(4, rs.randint(1, 5), replace=False).tolist()) for v in variables}
+    mixed = {key: mixed_relations[rs.randint(len(mixed_relations))] for key in itertools.combinations(variables, 2) if rs.rand() < 0.6}
+    if len(variables) >= 3 and rs.rand() < 0.3:
+        mixed.pop(tuple(variables[:2]), None)
+        mixed[tuple(variables[:3])] = AllDifferent(variables[:3])
+    brute_force = 0
+    for assignment in itertools.product(*(sorted(mixed_domains[v]) for v in variables)):
+        if all(c(*(assignment[v] for v in key)) for key, c in mixed.items()):
+            brute_force += 1
+    for use_cache in [False, True]:
+        assert count_solutions_for_bcn((mixed_domains, mixed), limit=1000, use_cache=use_cache) == brute_force, trial
+search, _ = get_general_constructive_search_for_bcn((domains, {}), groups=groups, limit=5)
+while search.active:
+    search.step()
+assert search.solution_count == 5 and search.best is not None
+print("Solution counting: OK")
+
+
+# ---- MAC search with trail agrees with brute force ----
+print("\n=== MAC search ===")
+from mac import get_mac_search_for_bcn
+
+rs = np.random.RandomState(2)
+for _ in range(200):
+    n_vars = rs.randint(2, 6)
+    domains = {i: set(rs.choice(8, rs.randint(1, 6), replace=False).tolist()) for i in range(n_vars)}
+    constraints = {}
+    for _ in range(rs.randint(1, 6)):
+        a, b = sorted(rs.choice(n_vars, 2, replace=False).tolist())
+        k = int(rs.randint(2, 10))
+        constraints[(a, b)] = lambda x, y, k=k: (3 * x + y) % k != 1
+    if n_vars > 2 and rs.rand() < 0.5:
+        constraints[tuple(range(n_vars))] = AllDifferent(tuple(range(n_vars)))
+    solutions = [
+        p for p in itertools.product(*[sorted(domains[i]) for i in range(n_vars)])
+        if all(c(*[p[var] for var in key]) for key, c in constraints.items())
+    ]
+    for learning in [False, True]:
+        search, decoder = get_mac_search_for_bcn((domains, constraints), learning=learning)
+        while search.active:
+            search.step()
+        if not solutions:
+            assert search.best is None
+        else:
+            sol = decoder(search.best)
+            assert tuple(sol[i] for i in range(n_vars)) in solutions
+
+for binarized in [False, True]:
+    search, decoder = get_mac_search_for_bcn(get_bcn_for_sudoku(board_9, binarized=binarized))
+    while search.active:
+        search.step()
+    assert search.best is not None
+
+# a single AllDifferent over 5000 variables (see the AllDifferent section)
+search, decoder = get_mac_search_for_bcn(wide)
+while search.active:
+    search.step()
+assert decoder(search.best) == {i: next(iter(D)) for i, D in expected.items()}
+print("MAC search: OK")
+
+# ---- Backjumping over an independent, unsatisfiable part ----
+# x0..x5 are free, while the pigeonhole x6..x9 (4 variables, 3 values) only
+# fails deep down. Chronological backtracking retries it for every assignment
+# of x0..x5, backjumping gives up after the first failure.
+print("\n=== MAC with nogoods and backjumping ===")
+domains = {i: {0, 1, 2} for i in range(10)}
+constraints = {(i, j): lambda x, y: x != y for i in range(6, 10) for j in range(i + 1, 10)}
+constraints.update({(i, i + 1): lambda x, y: x <= y for i in range(5)})
+nodes = {}
+for learning in [False, True]:
+    search, _ = get_mac_search_for_bcn((domains, constraints), phi=lambda d: min(d, key=lambda v: (len(d[v]) == 1, v)), learning=learning)
+    while search.active:
+        search.step()
+    assert search.best is None
+    nodes[learning] = search.stats["nodes"]
+print(f"  nodes chronological={nodes[False]}  backjumping={nodes[True]}")
+assert nodes[True] < nodes[False]
+
+t0 = time.time()
+search, decoder = get_mac_search_for_bcn(get_bcn_for_sudoku(board_9), learning=True)
+while search.active:
+    search.step()
+sol = decoder(search.best)
+assert all(sol[(r, c)] == board_9[r, c] for r in range(9) for c in range(9) if board_9[r, c])
+print(f"  sudoku: {search.stats}  {time.time() - t0:.3f}s")
+print("MAC with nogoods: OK")
+
+
+# ---- Portfolio of solver configurations ----
+print("\n=== Portfolio ===")
+import os
+import tempfile
+from general_constructive_search import GeneralConstructiveSearch
+from portfolio import DEFAULT_PORTFOLIO, solve_with_portfolio, _interleave
+
+with tempfile.TemporaryDirectory() as tmp:
+    log_path = os.path.join(tmp, "portfolio.log")
+    sol, winner = solve_with_portfolio(get_bcn_for_sudoku(board_9), log_path=log_path)
+    assert winner is not None
+    assert all(sol[(r, c)] == board_9[r, c] for r in range(9) for c in range(9) if board_9[r, c])
+    sol, winner = solve_with_portfolio(pigeonhole, log_path=log_path)
+    assert sol is None and winner is not None
+    with open(log_path) as f:
+        lines = [line.split("\t") for line in f.read().splitlines()]
+    assert len(lines) == 2 and lines[0][3] == "solved" and lines[1][3] == "infeasible"
+    print(f"  winners: {[line[1] for line in lines]}")
+
+# relations other than != (here ==) are respected by every configuration
+equal = ({"x": {1, 2}, "y": {1, 2}}, {("x", "y"): lambda a, b: a == b})
+for name, solver in DEFAULT_PORTFOLIO.items():
+    search, decoder = solver(equal)
+    while search.active:
+        search.step()
+    sol = decoder(search.best)
+    assert sol["x"] == sol["y"], name
+sol, winner = solve_with_portfolio(equal)
+assert sol["x"] == sol["y"] and winner is not None
+sol, winner = _interleave(equal, DEFAULT_PORTFOLIO, None)
+assert sol["x"] == sol["y"] and winner is not None
+
+# a seeded configuration draws its ties from a fresh random state on every call
+latin = {(r, c): set(range(5)) for r in range(5) for c in range(5)}
+lines = [tuple((r, c) for c in range(5)) for r in range(5)] + [tuple((r, c) for r in range(5)) for c in range(5)]
+latin_bcn = (latin, {line: AllDifferent(line) for line in lines})
+runs = []
+for _ in range(2):
+    search, decoder = DEFAULT_PORTFOLIO["mrv_geometric"](latin_bcn)
+    while search.active:
+        search.step()
+    runs.append(decoder(search.best))
+assert runs[0] == runs[1]
+
+# a configuration that never finishes is cut off by the timeout
+never = {"never": lambda bcn: (GeneralConstructiveSearch(w0=0, succ=lambda n: [n + 1], goal=lambda n: False), None)}
+t0 = time.time()
+assert solve_with_portfolio(pigeonhole, portfolio=never, timeout=0.5) == (None, None)
+assert _interleave(pigeonhole, never, 0.2) == (None, None)
+assert time.time() - t0 < 5
+
+# processes that die without answering end the race without waiting for the timeout
+t0 = time.time()
+assert solve_with_portfolio(pigeonhole, portfolio={"crash": lambda bcn: os._exit(1)}, timeout=30) == (None, None)
+assert time.time() - t0 < 5
+print("Portfolio: OK")
@@ -6,9 +6,12 @@ import time
 from tsp import TSP
 from gcs_ga_runner import (
     init, crossover, mutate,
-    run_genetic_search_for_gcs,
+    run_genetic_search_for_gcs, _two_opt, _nearest_neighbor, _seed_starts,
+    init_batch, crossover_batch, mutate_batch, _random_cuts,
 )
-from ga import GeneticSearch
+from ga import GeneticSearch, SCHEMES
+from island_ga import get_island_random_states, run_island_ga
+from local_search import candidate_lists, local_search
 
 # ---- Unit tests for operators ----
 print("=== Operator tests ===")
@@ -31,6 +34,71 @@ assert sorted(m) == locs
 assert m != pop[0]
 print("mutate: OK")
 
+# ---- Vectorized route costs ----
+print("\n=== Route costs ===")
+tsp20 = TSP(n=20, random_state=np.random.RandomState(3))
+routes = np.array(init(list(range(20)), np.random.RandomState(1), 8))
+loop_costs = [sum(tsp20.distances[r[k - 1], r[k]] for k in range(1, 20)) for r in routes]
+assert np.allclose([tsp20.get_cost_of_route(list(r)) for r in routes], loop_costs)
+assert np.allclose(tsp20.get_costs_of_routes(routes), loop_costs)
+assert tsp20.get_cost_of_route([]) == 0 and tsp20.get_cost_of_route([4]) == 0
+better = tsp20.get_cached_comparator()
+for r1 in routes:
+    for r2 in routes:
+        assert better(list(r1), list(r2)) == tsp20.is_better_route_than(r1, r2)
+assert better.cost.cache_info().misses == len(routes)
+print("route costs: OK")
+
+# ---- Distance matrix construction ----
+print("\n=== Distance matrices ===")
+rs = np.random.RandomState(5)
+locations = [np.array([rs.random() * 10, rs.random() * 2]) for _ in range(60)]
+tsp60 = TSP(n=60, random_state=np.random.RandomState(5), width_x=10, width_y=2)
+assert np.array_equal(np.array(locations), tsp60.coordinates)
+loop = np.array([[np.linalg.norm(a - b) for b in locations] for a in locations])
+assert np.allclose(tsp60.distances, loop)
+assert TSP(n=60, random_state=np.random.RandomState(5), dtype=np.float32).distances.dtype == np.float32
+lazy60 = TSP(n=60, random_state=np.random.RandomState(5), width_x=10, width_y=2, lazy=True)
+assert np.allclose(lazy60.distances[:, :], loop) and np.allclose(lazy60.distances[7, :], loop[7])
+route = list(np.random.RandomState(0).permutation(60))
+assert np.isclose(lazy60.get_cost_of_route(route), tsp60.get_cost_of_route(route))
+candidates = lazy60.get_candidates(6)
+masked = loop + np.diag([np.inf] * 60)
+assert np.allclose(np.take_along_axis(masked, candidates, axis=1), np.sort(masked, axis=1)[:, :6])
+t0 = time.time()
+tsp_big = TSP(n=50000, random_state=np.random.RandomState(0), lazy=True)
+assert tsp_big.get_candidates(8).shape == (50000, 8)
+print(f"  50k locations (lazy) with 8 candidates each: {time.time() - t0:.2f}s")
+print("distance matrices: OK")
+
+# ---- Neighbour-list local search ----
+print("\n=== Local search ===")
+for n in (5, 50, 200):
+    tsp_ls = TSP(n=n, random_state=np.random.RandomState(n))
+    start = list(np.random.RandomState(0).permutation(n))
+    candidates = candidate_lists(tsp_ls.distances, 8)
+    assert (candidates == tsp_ls.get_candidates(8)).all()
+    for kwargs in ({}, {"or_opt": False}, {"coordinates": tsp_ls.coordinates}, {"max_depth": 10}):
+        route = local_search(start, tsp_ls.distances, candidates, **kwargs)
+        assert sorted(route) == list(range(n))
+        assert tsp_ls.get_cost_of_route(route) <= tsp_ls.get_cost_of_route(start) + 1e-9
+    # variable-depth moves only start from local optima of 2-opt and Or-opt and never make them worse
+    two_opt_optimum = local_search(start, tsp_ls.distances, candidates)
+    deeper = local_search(two_opt_optimum, tsp_ls.distances, candidates, max_depth=10)
+    assert tsp_ls.get_cost_of_route(deeper) <= tsp_ls.get_cost_of_route(two_opt_optimum) + 1e-9
+    # past its deadline, the search returns the route unchanged
+    assert local_search(start, tsp_ls.distances, candidates, deadline=0) == start
+    t0 = time.time()
+    route = local_search(start, tsp_ls.distances, candidates)
+    t_new = time.time() - t0
+    t0 = time.time()
+    reference = _two_opt(start, tsp_ls.distances)
+    t_old = time.time() - t0
+    print(f"  {n} locations: {t_new:.3f}s cost {tsp_ls.get_cost_of_route(route):.4f}"
+          f" (full 2-opt {t_old:.3f}s cost {tsp_ls.get_cost_of_route(reference):.4f})")
+    assert n < 200 or t_new < t_old
+print("local search: OK")
+
 # ---- GeneticSearch class ----
 print("\n=== GeneticSearch class ===")
 tsp10 = TSP(n=10, random_state=np.random.RandomState(0))
@@ -51,8 +119,303 @@ assert len(ga.population) == 10
 for gen in range(20):
     ga.step()
 print(f"After 20 gens: cost = {tsp10.get_cost_of_route(ga.best):.4f}")
+
+# with a fitness function, every individual is evaluated exactly once
+evaluations = []
+
+
+def counted_cost(route):
+    evaluations.append(1)
+    return tsp10.get_cost_of_route(route)
+
+
+runs = []
+for kwargs in ({"better": tsp10.is_better_route_than}, {"better": None, "fitness": counted_cost}):
+    rs2 = np.random.RandomState(0)
+    ga = GeneticSearch(
+        init=lambda n: init(list(range(10)), rs2, n),
+        crossover=lambda p1, p2: crossover(rs2, p1, p2),
+        mutate=lambda i: mutate(rs2, i),
+        population_size=10,
+        **kwargs,
+    )
+    ga.reset()
+    for gen in range(20):
+        ga.step()
+    runs.append(ga)
+assert len(evaluations) == runs[1].num_solutions
+assert np.isclose(runs[1].best_fitness, tsp10.get_cost_of_route(runs[1].best))
+assert runs[1].fitnesses == sorted(runs[1].fitnesses)
+assert np.allclose(runs[1].fitnesses, [tsp10.get_cost_of_route(r) for r in runs[1].population])
+assert np.isclose(runs[1].best_fitness, tsp10.get_cost_of_route(runs[0].best))
 print("GeneticSearch: OK")
 
+# ---- Reproduction schemes ----
+print("\n=== Reproduction schemes ===")
+tsp30 = TSP(n=30, random_state=np.random.RandomState(1))
+for scheme in SCHEMES:
+    for kwargs in ({"better": tsp30.is_better_route_than}, {"better": None, "fitness": tsp30.get_cost_of_route}):
+        rs3 = np.random.RandomState(0)
+        ga = GeneticSearch(
+            init=lambda n: init(list(range(30)), rs3, n),
+            crossover=lambda p1, p2: crossover(rs3, p1, p2),
+            mutate=lambda i: mutate(rs3, i),
+            population_size=40,
+            scheme=scheme,
+            offspring_size=None if scheme == "all_pairs" else 50,
+            random_state=np.random.RandomState(2),
+            **kwargs,
+        )
+        ga.reset()
+        costs = [tsp30.get_cost_of_route(ga.best)]
+        t0 = time.time()
+        for gen in range(5 if scheme == "all_pairs" else 30):
+            ga.step()
+            costs.append(tsp30.get_cost_of_route(ga.best))
+        assert len(ga.population) == 40
+        assert all(sorted(r) == list(range(30)) for r in ga.population)
+        assert costs == sorted(costs, reverse=True)
+        if "fitness" in kwargs:
+            assert np.allclose(ga.fitnesses, [tsp30.get_cost_of_route(r) for r in ga.population])
+            print(f"  {scheme:<16} {(time.time() - t0) / (len(costs) - 1):.4f}s per generation, cost {costs[-1]:.4f}")
+        if scheme != "all_pairs":
+            assert ga.num_solutions == 40 + 30 * 50
+
+
+def replace_worst(fitnesses, offspring_fitnesses):
+    """Reference steady-state replacement: every better child replaces the current worst, one at a time."""
+    fitnesses = list(fitnesses)
+    for f in offspring_fitnesses:
+        worst = max(range(len(fitnesses)), key=fitnesses.__getitem__)
+        if f < fitnesses[worst]:
+            fitnesses[worst] = f
+    return sorted(fitnesses)
+
+
+# fewer offspring than population_size - 1
+for scheme in ("tournament", "steady_state"):
+    for kwargs in ({"better": tsp30.is_better_route_than}, {"better": None, "fitness": tsp30.get_cost_of_route}):
+        rs3 = np.random.RandomState(0)
+        ga = GeneticSearch(
+            init=lambda n: init(list(range(30)), rs3, n),
+            crossover=lambda p1, p2: crossover(rs3, p1, p2),
+            mutate=lambda i: mutate(rs3, i),
+            population_size=10,
+            scheme=scheme,
+            offspring_size=2,
+            random_state=np.random.RandomState(2),
+            **kwargs,
+        )
+        ga.reset()
+        bred = []
+        breed = ga._breed
+        ga._breed = lambda: bred.append(breed()) or bred[-1]
+        for gen in range(20):
+            parents = [tsp30.get_cost_of_route(r) for r in ga.population]
+            ga.step()
+            costs = [tsp30.get_cost_of_route(r) for r in ga.population]
+            assert len(ga.population) == 10
+            if scheme == "tournament":
+                assert min(costs) <= min(parents)
+            else:
+                offspring_costs = [tsp30.get_cost_of_route(r) for r in bred[-1][0]]
+                assert np.allclose(sorted(costs), replace_worst(parents, offspring_costs))
+# by default, steady-state breeds two children per step, so children become parents
+# after a step, while mu_plus_lambda breeds a whole population before selecting
+populations = {}
+for scheme in ("steady_state", "mu_plus_lambda"):
+    rs3 = np.random.RandomState(0)
+    ga = GeneticSearch(
+        init=lambda n: init(list(range(30)), rs3, n),
+        crossover=lambda p1, p2: crossover(rs3, p1, p2),
+        mutate=lambda i: mutate(rs3, i),
+        better=None,
+        fitness=tsp30.get_cost_of_route,
+        population_size=40,
+        scheme=scheme,
+        random_state=np.random.RandomState(2),
+    )
+    ga.reset()
+    for gen in range(5):
+        before = [tuple(r) for r in ga.population]
+        ga.step()
+        changed = sum(tuple(r) not in before for r in ga.population)
+        assert changed <= 2 if scheme == "steady_state" else changed > 2
+    assert ga.num_solutions == 40 + 5 * (2 if scheme == "steady_state" else 40)
+    populations[scheme] = sorted(tuple(r) for r in ga.population)
+assert populations["steady_state"] != populations["mu_plus_lambda"]
+try:
+    GeneticSearch(init, crossover, mutate, tsp30.is_better_route_than, 10, scheme="mu_comma_lambda", offspring_size=5)
+    assert False
+except ValueError:
+    pass
+print("reproduction schemes: OK")
+
+# ---- Array-backed populations ----
+print("\n=== Batch operators ===")
+rs4 = np.random.RandomState(4)
+for n in (2, 3, 10, 30):
+    batch_pop = init_batch(n, rs4, 40)
+    assert batch_pop.shape == (40, n) and batch_pop.dtype == np.int32
+    assert (np.sort(batch_pop, axis=1) == np.arange(n)).all()
+    children = crossover_batch(rs4, batch_pop[:20], batch_pop[20:])
+    assert children.shape == (40, n) and (np.sort(children, axis=1) == np.arange(n)).all()
+    mutants = mutate_batch(rs4, batch_pop)
+    assert (np.sort(mutants, axis=1) == np.arange(n)).all()
+    assert (mutants != batch_pop).any(axis=1).all()
+# batch OX makes the same children as OX on lists for the same cut points
+for _ in range(50):
+    p1, p2 = init_batch(12, rs4, 2)
+    state = rs4.get_state()
+    children = crossover_batch(rs4, p1[None], p2[None])
+    rs4.set_state(state)
+    c1, c2 = (int(c[0]) for c in _random_cuts(rs4, 1, 12))
+    c2 -= c2 - c1 >= 11
+    for child, (donor, filler) in zip(children.tolist(), ((p1, p2), (p2, p1))):
+        segment = donor[c1:c2 + 1].tolist()
+        rest = [v for v in filler.tolist() if v not in segment]
+        assert child[c1:c2 + 1] == segment
+        assert child[c2 + 1:] + child[:c1] == rest
+for scheme in SCHEMES:
+    rs4 = np.random.RandomState(0)
+    ga = GeneticSearch(
+        init=lambda n: init_batch(30, rs4, n),
+        crossover=lambda p1, p2: crossover_batch(rs4, p1, p2),
+        mutate=lambda i: mutate_batch(rs4, i),
+        better=None,
+        population_size=40,
+        fitness=tsp30.get_costs_of_routes,
+        scheme=scheme,
+        offspring_size=None if scheme == "all_pairs" else 50,
+        random_state=rs4,
+        batch=True,
+    )
+    ga.reset()
+    costs = [ga.best_fitness]
+    t0 = time.time()
+    for gen in range(5 if scheme == "all_pairs" else 30):
+        ga.step()
+        costs.append(ga.best_fitness)
+    assert ga.population.shape == (40, 30)
+    assert (np.sort(ga.population, axis=1) == np.arange(30)).all()
+    assert costs == sorted(costs, reverse=True)
+    assert np.allclose(ga.fitnesses, tsp30.get_costs_of_routes(ga.population))
+    assert np.isclose(ga.best_fitness, tsp30.get_cost_of_route(list(ga.best)))
+    print(f"  {scheme:<16} {(time.time() - t0) / (len(costs) - 1):.4f}s per generation, cost {costs[-1]:.4f}")
+# fewer offspring than population_size - 1
+for scheme in ("tournament", "steady_state"):
+    rs4 = np.random.RandomState(0)
+    evaluated = []
+    ga = GeneticSearch(
+        init=lambda n: init_batch(30, rs4, n),
+        crossover=lambda p1, p2: crossover_batch(rs4, p1, p2),
+        mutate=lambda i: mutate_batch(rs4, i),
+        better=None,
+        population_size=10,
+        fitness=lambda routes: evaluated.append(tsp30.get_costs_of_routes(routes)) or evaluated[-1],
+        scheme=scheme,
+        offspring_size=2,
+        random_state=rs4,
+        batch=True,
+    )
+    ga.reset()
+    for gen in range(20):
+        parents = ga.fitnesses.tolist()
+        ga.step()
+        assert ga.population.shape == (10, 30)
+        assert np.allclose(ga.fitnesses, tsp30.get_costs_of_routes(ga.population))
+        if scheme == "steady_state":
+            assert np.allclose(sorted(ga.fitnesses), replace_worst(parents, evaluated[-1]))
+try:
+    GeneticSearch(init, crossover, mutate, tsp30.is_better_route_than, 10, batch=True)
+    assert False
+except ValueError:
+    pass
+print("batch operators: OK")
+
+# ---- Island model ----
+print("\n=== Island model ===")
+states = get_island_random_states(4, seed=7)
+draws = [tuple(rs.randint(10**9, size=3)) for rs in states]
+assert len(set(draws)) == 4
+assert draws == [tuple(rs.randint(10**9, size=3)) for rs in get_island_random_states(4, seed=7)]
+
+
+def make_island(rs):
+    return GeneticSearch(
+        init=lambda n: init(list(range(30)), rs, n),
+        crossover=lambda p1, p2: crossover(rs, p1, p2),
+        mutate=lambda i: mutate(rs, i),
+        better=None,
+        population_size=20,
+        fitness=tsp30.get_cost_of_route,
+        scheme="mu_plus_lambda",
+        random_state=rs,
+    )
+
+
+ga = make_island(np.random.RandomState(0))
+ga.reset()
+stranger = list(range(30))
+assert ga.immigrate([stranger]) == (tsp30.get_cost_of_route(stranger) < min(ga.fitnesses))
+assert stranger in ga.population and len(ga.population) == 20
+assert np.allclose(ga.fitnesses, [tsp30.get_cost_of_route(r) for r in ga.population])
+assert ga.emigrants(3) == [ga.population[i] for i in np.argsort(ga.fitnesses, kind="stable")[:3]]
+for num_islands in (1, 3):
+    t0 = time.time()
+    best_island, generations = run_island_ga(make_island, 1.0, num_islands=num_islands, migration_interval=5)
+    elapsed = time.time() - t0
+    assert sorted(best_island) == list(range(30))
+    assert len(generations) == num_islands and all(g > 0 for g in generations)
+    assert elapsed < 1.5
+    print(f"  {num_islands} island(s): cost {tsp30.get_cost_of_route(best_island):.4f}, generations {generations}")
+print("island model: OK")
+
+# ---- Parallel multi-start ILS ----
+print("\n=== Parallel ILS ===")
+tsp80 = TSP(n=80, random_state=np.random.RandomState(8))
+for n_workers in (1, 3):
+    t0 = time.time()
+    best80 = run_genetic_search_for_gcs(
+        tsp80, timeout=3, random_state=np.random.RandomState(0), n_workers=n_workers
+    )
+    elapsed = time.time() - t0
+    assert sorted(best80) == list(range(80))
+    assert elapsed < 3
+    print(f"  {n_workers} worker(s): cost = {tsp80.get_cost_of_route(best80):.4f}  time = {elapsed:.2f}s")
+print("parallel ILS: OK")
+
+# ---- Nearest-neighbour seeds from candidate lists ----
+print("\n=== Nearest-neighbour seeds ===")
+
+
+def nearest_neighbor_reference(dist, n, start):
+    route, cur = [start], start
+    while len(route) < n:
+        cur = min((j for j in range(n) if j not in route), key=lambda j: dist[cur, j])
+        route.append(cur)
+    return route
+
+
+for n in (1, 2, 3, 60, 300):
+    for lazy in (False, True):
+        tsp_nn = TSP(n=n, random_state=np.random.RandomState(n), lazy=lazy)
+        neighbours = tsp_nn.get_candidates(5).tolist()
+        for s in (0, n // 2):
+            assert _nearest_neighbor(tsp_nn.distances, n, s, neighbours) == nearest_neighbor_reference(tsp_nn.distances, n, s)
+        # past the deadline, the route is still completed
+        assert sorted(_nearest_neighbor(tsp_nn.distances, n, 0, neighbours, deadline=0)) == list(range(n))
+assert _seed_starts(1000) == list(range(1000))
+assert 1 <= len(_seed_starts(50000)) <= 50
+t0 = time.time()
+best_big = run_genetic_search_for_gcs(tsp_big, timeout=5, random_state=np.random.RandomState(0))
+elapsed = time.time() - t0
+assert sorted(best_big) == list(range(50000))
+assert elapsed < 5
+assert tsp_big.get_cost_of_route(best_big) < tsp_big.get_cost_of_route(list(range(50000))) / 10
+print(f"  50k locations (lazy), 5s: cost = {tsp_big.get_cost_of_route(best_big):.1f}  time = {elapsed:.2f}s")
+print("nearest-neighbour seeds: OK")
+
 # ---- Full solver: 10 locations, 10s (1x1 area, matching grader) ----
 print("\n=== 10 locations, 10s (1x1 area) ===")
 tsp10 = TSP(n=10, random_state=np.random.RandomState(0))
@@ -0,0 +1,110 @@
+import os
+import tempfile
+
+import numpy as np
+
+import sudoku_batch
+from sudoku_batch import _chunks, parse_puzzle, read_puzzles, solve_puzzle, solve_puzzle_file
+from sudoku_benchmark import _is_valid_solution, generate_sudoku
+
+
+def to_line(puzzle, delimited=False):
+    return ("," if delimited else "").join(str(v) for v in puzzle.ravel())
+
+
+def to_assignment(line):
+    grid = parse_puzzle(line)
+    return {(r, c): int(grid[r, c]) for r in range(grid.shape[0]) for c in range(grid.shape[1])}
+
+
+class CountingExecutor(sudoku_batch.ProcessPoolExecutor):
+    """Process pool that records the largest number of chunks in flight."""
+
+    max_in_flight = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_flight = 0
+
+    def submit(self, fn, *args, **kwargs):
+        future = super().submit(fn, *args, **kwargs)
+        self.in_flight += 1
+        CountingExecutor.max_in_flight = max(CountingExecutor.max_in_flight, self.in_flight)
+        executor = self
+
+        class Collected:
+            def result(self):
+                executor.in_flight -= 1
+                return future.result()
+
+        return Collected()
+
+
+if __name__ == "__main__":
+    # ---- Parsing ----
+    print("=== Parsing ===")
+    puzzle9, _ = generate_sudoku(3, 0.5, np.random.RandomState(0))
+    line9 = to_line(puzzle9)
+    assert (parse_puzzle(line9) == puzzle9).all()
+    assert (parse_puzzle(to_line(puzzle9, delimited=True)) == puzzle9).all()
+    puzzle16, _ = generate_sudoku(4, 0.4, np.random.RandomState(1))
+    assert (parse_puzzle(to_line(puzzle16, delimited=True)) == puzzle16).all()
+    assert (parse_puzzle(" ".join(str(v) for v in puzzle16.ravel())) == puzzle16).all()
+    for bad in ("1" * 16, "1" * 256, "1" * 80, ",".join(["1"] * 15), ",".join(["17"] * 16), "1,x,0,0"):
+        try:
+            parse_puzzle(bad)
+            assert False, bad
+        except ValueError:
+            pass
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "puzzles.txt")
+        with open(path, "w") as f:
+            f.write(f"# comment\n\n{line9.replace('0', '.')}\n{to_line(puzzle16, delimited=True)}\n")
+        lines = list(read_puzzles(path))
+    assert lines == [line9, to_line(puzzle16, delimited=True)]
+    print("parsing: OK")
+
+    # ---- Solving ----
+    print("\n=== Solving ===")
+    assert _is_valid_solution(puzzle9, to_assignment(solve_puzzle(line9)))
+    solved16 = solve_puzzle(to_line(puzzle16, delimited=True))
+    assert _is_valid_solution(puzzle16, to_assignment(solved16))
+    unsolvable = "55" + line9[2:]
+    assert solve_puzzle(unsolvable) == ""
+    print("solving: OK")
+
+    # ---- Chunking ----
+    print("\n=== Chunking ===")
+    assert [len(c) for c in _chunks(iter(range(10)), 4)] == [4, 4, 2]
+    assert list(_chunks(iter([]), 4)) == []
+    print("chunking: OK")
+
+    # ---- Batch files ----
+    print("\n=== Batch files ===")
+    puzzles = [generate_sudoku(3, 0.55, np.random.RandomState(seed)) for seed in range(12)]
+    lines = [to_line(p) for p, _ in puzzles]
+    lines.insert(5, unsolvable)
+    lines.insert(9, "1" * 80)  # malformed: rejected, not fatal
+    sudoku_batch.ProcessPoolExecutor, original_executor = CountingExecutor, sudoku_batch.ProcessPoolExecutor
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            in_path, out_path = os.path.join(tmp, "in.txt"), os.path.join(tmp, "out.txt")
+            with open(in_path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+            stats = solve_puzzle_file(in_path, out_path, workers=2, chunk_size=2, max_pending=2, reservoir_size=5)
+            with open(out_path) as f:
+                solutions = f.read().split("\n")[:-1]
+    finally:
+        sudoku_batch.ProcessPoolExecutor = original_executor
+    assert len(solutions) == len(lines)
+    assert solutions[5] == "" and solutions[9] == ""
+    # generated puzzles may have several solutions, so check validity in input order
+    for (puzzle, _), solution in zip(puzzles, solutions[:5] + solutions[6:9] + solutions[10:]):
+        assert _is_valid_solution(puzzle, to_assignment(solution))
+    assert 1 <= CountingExecutor.max_in_flight <= 2
+    assert stats["puzzles"] == 14 and stats["solved"] == 12 and stats["rejected"] == 1
+    assert stats["puzzles_per_sec"] > 0
+    assert 0 < stats["latency_p50"] <= stats["latency_p90"] <= stats["latency_p99"]
+    print(f"  {stats['puzzles_per_sec']:.1f} puzzles/s, p50 latency {stats['latency_p50'] * 1000:.2f}ms")
+    print("batch files: OK")
+    print("ALL DONE")
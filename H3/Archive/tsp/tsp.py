@@ -1,28 +1,168 @@
+import functools
+
 import numpy as np
 import matplotlib.pyplot as plt
 
 
+def pairwise_distances_between(a, b):
+    """
+    :param a: m x 2 array of locations
+    :param b: n x 2 array of locations
+    :return: m x n matrix of Euclidean distances between the rows of a and b
+    """
+    diff_x = a[:, None, 0] - b[None, :, 0]
+    diff_y = a[:, None, 1] - b[None, :, 1]
+    return np.sqrt(diff_x * diff_x + diff_y * diff_y)
+
+
+def pairwise_distances(coordinates, dtype=np.float64):
+    """
+    :param coordinates: n x 2 array of locations
+    :param dtype: dtype of the result
+    :return: dense n x n matrix of Euclidean distances, computed by broadcasting
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    return pairwise_distances_between(coordinates, coordinates).astype(dtype, copy=False)
+
+
+def nearest_neighbors(coordinates, k):
+    """
+    :param coordinates: n x 2 array of locations
+    :param k: number of neighbours per location (at most n - 1)
+    :return: n x k array with the indices of the k nearest other locations of every location, closest first
+
+    The locations are bucketed into a grid with about 2k locations per cell. The
+    neighbours of the locations of a cell are searched in the surrounding square
+    of cells, which is widened for every location whose k-th neighbour could
+    lie outside of it, so the result is exact without a dense distance matrix.
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    n = len(coordinates)
+    k = min(k, n - 1)
+    result = np.empty((n, max(k, 0)), dtype=np.intp)
+    if k <= 0:
+        return result
+
+    low = coordinates.min(axis=0)
+    extent = np.maximum(coordinates.max(axis=0) - low, 1e-12)
+    h = max(np.sqrt(extent[0] * extent[1] * 2 * k / n), extent.max() / max(n, 1), 1e-12)
+    grid = np.maximum(np.ceil(extent / h).astype(int), 1)
+    cells = np.minimum(((coordinates - low) / h).astype(int), grid - 1)
+    cell_ids = cells[:, 0] * grid[1] + cells[:, 1]
+    order = np.argsort(cell_ids, kind="stable")
+    bounds = np.searchsorted(cell_ids[order], np.arange(grid[0] * grid[1] + 1))
+
+    for cell in np.unique(cell_ids):
+        cx, cy = divmod(int(cell), int(grid[1]))
+        pending = order[bounds[cell]: bounds[cell + 1]]
+        r = 1
+        while len(pending):
+            x0, x1 = max(cx - r, 0), min(cx + r, grid[0] - 1)
+            y0, y1 = max(cy - r, 0), min(cy + r, grid[1] - 1)
+            candidates = np.concatenate([
+                order[bounds[x * grid[1] + y0]: bounds[x * grid[1] + y1 + 1]] for x in range(x0, x1 + 1)
+            ])
+            covers_all = x0 == 0 and y0 == 0 and x1 == grid[0] - 1 and y1 == grid[1] - 1
+            if len(candidates) <= k and not covers_all:
+                r += 1
+                continue
+            d = pairwise_distances_between(coordinates[pending], coordinates[candidates])
+            d[pending[:, None] == candidates[None, :]] = np.inf
+            nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+            nearest_d = np.take_along_axis(d, nearest, axis=1)
+            by_distance = np.argsort(nearest_d, axis=1)
+            nearest = np.take_along_axis(nearest, by_distance, axis=1)
+            kth = np.take_along_axis(nearest_d, by_distance[:, -1:], axis=1)[:, 0]
+            # distance of every location to the border of the searched square (sides at the grid border don't count)
+            p = coordinates[pending] - low
+            margin = np.full(len(pending), np.inf)
+            if x0 > 0:
+                margin = np.minimum(margin, p[:, 0] - x0 * h)
+            if x1 < grid[0] - 1:
+                margin = np.minimum(margin, (x1 + 1) * h - p[:, 0])
+            if y0 > 0:
+                margin = np.minimum(margin, p[:, 1] - y0 * h)
+            if y1 < grid[1] - 1:
+                margin = np.minimum(margin, (y1 + 1) * h - p[:, 1])
+            done = kth <= margin
+            result[pending[done]] = candidates[nearest[done]]
+            pending = pending[~done]
+            r += 1
+    return result
+
+
+class LazyDistanceMatrix:
+    """
+    Stand-in for a dense distance matrix that computes Euclidean distances on
+    demand from the coordinates, with O(n) memory. Indexing follows numpy:
+    scalars and index arrays are paired elementwise (with broadcasting), a
+    slice combined with a scalar gives a row or column, and two slices a block.
+    """
+
+    def __init__(self, coordinates, dtype=np.float64):
+        self.coordinates = coordinates
+        self.dtype = np.dtype(dtype)
+        self.shape = (len(coordinates), len(coordinates))
+
+    def __getitem__(self, index):
+        i, j = index
+        if isinstance(i, slice) and isinstance(j, slice):
+            return pairwise_distances_between(self.coordinates[i], self.coordinates[j]).astype(self.dtype)
+        diff = self.coordinates[i] - self.coordinates[j]
+        return np.sqrt((diff * diff).sum(axis=-1)).astype(self.dtype)
+
+    def __len__(self):
+        return self.shape[0]
+
+
 class TSP:
 
-    def __init__(self, n, random_state=None, width_x=1, width_y=1):
+    def __init__(self, n, random_state=None, width_x=1, width_y=1, dtype=np.float64, lazy=False):
+        """
+        :param n: number of locations, sampled uniformly from [0, width_x] x [0, width_y]
+        :param random_state: random state to control the sampling
+        :param dtype: dtype of the distances (e.g. np.float32 to halve the memory of the matrix)
+        :param lazy: if True, `distances` is a `LazyDistanceMatrix` that computes entries on demand
+                     instead of a dense n x n array (for instances with tens of thousands of locations)
+        """
         if random_state is None:
             random_state = np.random.RandomState()
         self.width_x = width_x
         self.width_y = width_y
-        self.locations = []
-        for i in range(n):
-            self.locations.append(np.array([random_state.random() * width_x, random_state.random() * width_y]))
-        self.distances = np.zeros((n, n))
-        for i, l1 in enumerate(self.locations):
-            for j, l2 in enumerate(self.locations[:i]):
-                self.distances[i, j] = self.distances[j, i] = np.linalg.norm(l1 - l2)
+        # same draws as sampling x and y location by location
+        self.coordinates = random_state.random((n, 2)) * np.array([width_x, width_y])
+        self.locations = list(self.coordinates)
+        if lazy:
+            self.distances = LazyDistanceMatrix(self.coordinates, dtype)
+        else:
+            self.distances = pairwise_distances(self.coordinates, dtype)
+        self._candidates = {}
+
+    def get_candidates(self, k=10):
+        """
+        :param k: number of candidates per location
+        :return: n x k array with the k nearest other locations of every location, closest first;
+                 computed from the coordinates (never needs the dense matrix) and cached per k
+        """
+        if k not in self._candidates:
+            self._candidates[k] = nearest_neighbors(self.coordinates, k)
+        return self._candidates[k]
 
     def get_cost_of_route(self, r):
-        c = 0
-        for i, l in enumerate(r[1:], start=1):
-            prev_l = r[i - 1]
-            c += self.distances[prev_l, l]
-        return c
+        """
+        :param r: list (or 1-D array) of locations to visit
+        :return: total length of the route, summed in one fancy-indexing call
+        """
+        r = np.asarray(r, dtype=np.intp)
+        return self.distances[r[:-1], r[1:]].sum()
+
+    def get_costs_of_routes(self, routes):
+        """
+        :param routes: population of routes of equal length as 2-D index array (or list of lists), one route per row
+        :return: 1-D array with the cost of every route
+        """
+        routes = np.asarray(routes, dtype=np.intp)
+        return self.distances[routes[:, :-1], routes[:, 1:]].sum(axis=1)
 
     def is_better_route_than(self, r1, r2):
         """
@@ -34,7 +174,26 @@ class TSP:
         c2 = self.get_cost_of_route(r2)
         return c1 < c2
 
+    def get_cached_comparator(self, maxsize=2 ** 16):
+        """
+        :param maxsize: number of route costs kept (least recently used ones are evicted first)
+        :return: a drop-in replacement for `is_better_route_than` that computes the cost of every route only once;
+                 the cost function itself is available as its `cost` attribute
+        """
+
+        @functools.lru_cache(maxsize=maxsize)
+        def cost(route):
+            return self.get_cost_of_route(route)
+
+        def is_better_route_than(r1, r2):
+            return cost(tuple(r1)) < cost(tuple(r2))
+
+        is_better_route_than.cost = cost
+        return is_better_route_than
+
     def visualize(self):
+        if isinstance(self.distances, LazyDistanceMatrix):
+            raise ValueError("cannot plot the distance matrix of a lazy instance")
         fig, ax = plt.subplots(figsize=(self.width_x * 2, self.width_y * 2))
         ax.scatter([l[0] for l in self.locations], [l[1] for l in self.locations])
         plt.show()
@@ -42,4 +201,3 @@ class TSP:
         fig, ax = plt.subplots()
         ax.imshow(self.distances, cmap="Reds")
         plt.show()
-